@@ -0,0 +1,201 @@
+# execution.py
+# Array-backed execution state machine for the Demo's task DAG (no Streamlit import).
+# Status / progress live in NumPy arrays; dependencies are a CSR adjacency (task → dependents)
+# with a remaining-dependency counter per task. When a task finishes, its dependents' counters
+# are decremented and those that reach zero enter a ready queue, so a tick only touches tasks
+# that are running, in review or just unblocked — never the whole plan.
+# The `tasks` dict ({task_id: {status, progress, depends_on, ...}}) stays the public view:
+# after each `tick` only tasks whose status or progress changed are written back to it.
+# Stage counts are adjusted on every transition, and `top(stage, k)` (the Kanban columns) reads
+# the running / review frontiers, a cursor over not-yet-started tasks and the completion log, so
+# neither needs a pass over the whole plan.
+#   python execution.py --tasks 100000 --ticks 2000      # headless simulation of a large plan
+
+import argparse, time
+from typing import Dict, Optional
+import numpy as np
+
+STAGES = ["Planned", "In Progress", "Review", "Done"]
+STAGE_CODE = {s: i for i, s in enumerate(STAGES)}
+PLANNED, IN_PROGRESS, REVIEW, DONE = range(4)
+_THRESHOLDS = np.array([35, 70, 100])     # task_stage(): <35 Planned, <70 In Progress, <100 Review, else Done
+
+def stage_codes(progress):
+    return np.searchsorted(_THRESHOLDS, progress, side="right").astype(np.int8)
+
+class ExecEngine:
+    """Each tick: ready Planned tasks start; In Progress tasks gain 8–16% and take the stage of their
+    new progress (below 35% that is "Planned" again until the next tick restarts them); Review tasks
+    finish. These are the transitions of the old dict-walking `exec_tick`.
+
+    Build with `from_tasks(dict)` for the Streamlit view, or directly from arrays for headless runs
+    (`src[k] → dst[k]` means dst depends on src).
+    """
+
+    def __init__(self, ids, status, progress, src, dst, tasks: Optional[Dict[str, Dict]] = None):
+        self.ids = list(ids)
+        self.index = {tid: i for i, tid in enumerate(self.ids)}
+        self.tasks = tasks
+        N = self.n = len(self.ids)
+        self.status = np.asarray(status, dtype=np.int8).copy()
+        self.progress = np.asarray(progress, dtype=np.int16).copy()
+        src = np.asarray(src, dtype=np.intp); dst = np.asarray(dst, dtype=np.intp)
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=N)))).astype(np.intp)
+        self.dependents = dst[np.argsort(src, kind="stable")]
+        self.indegree = np.bincount(dst, minlength=N).astype(np.int32)
+        self._src, self._dst = src, dst
+        self.changed = np.empty(0, dtype=np.intp)     # tasks whose status / progress the last tick or reset wrote
+        self._rebuild_queues()
+
+    @classmethod
+    def from_tasks(cls, tasks: Dict[str, Dict]):
+        index = {tid: i for i, tid in enumerate(tasks)}
+        src, dst = [], []
+        for i, t in enumerate(tasks.values()):
+            for d in t["depends_on"]:
+                j = index.get(d)
+                if j is not None: src.append(j); dst.append(i)
+        N = len(tasks)
+        status = np.fromiter((STAGE_CODE.get(t["status"], PLANNED) for t in tasks.values()), dtype=np.int8, count=N)
+        progress = np.fromiter((t["progress"] for t in tasks.values()), dtype=np.int16, count=N)
+        return cls(list(tasks), status, progress, src, dst, tasks)
+
+    def _rebuild_queues(self):
+        st, pg = self.status, self.progress
+        self.remaining = np.bincount(self._dst, weights=st[self._src] != DONE, minlength=self.n).astype(np.int32)
+        planned = st == PLANNED
+        restarted = planned & (pg > 0) & (self.remaining == 0)    # would rejoin `active` on the next tick anyway
+        self.active = np.flatnonzero((st == IN_PROGRESS) | restarted)
+        self.review = np.flatnonzero(st == REVIEW)
+        self.ready = [np.flatnonzero(planned & ~restarted & (self.remaining == 0))]
+        self.counts = np.bincount(st, minlength=4).astype(np.int64)
+        self.started = np.zeros(self.n, dtype=bool); self.started[self.active] = True
+        self._unstarted = np.flatnonzero(planned & ~restarted); self._head = 0
+        self._done_log = [np.flatnonzero(st == DONE)]
+
+    # ---------- ticking ----------
+    def _release(self, done):
+        """Decrement dependents' counters; those reaching zero while Planned join the ready queue."""
+        starts = self.indptr[done]; lens = self.indptr[done + 1] - starts
+        total = int(lens.sum())
+        if not total: return
+        deps = self.dependents[np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(total)]
+        np.subtract.at(self.remaining, deps, 1)
+        deps = np.unique(deps)
+        newly = deps[(self.remaining[deps] == 0) & (self.status[deps] == PLANNED)]
+        if len(newly): self.ready.append(newly)
+
+    def tick(self, n=1, rng=None):
+        """Advance `n` ticks (stops early once nothing can change); returns the ticks applied."""
+        rng = rng if rng is not None else np.random.default_rng()
+        st, pg = self.status, self.progress
+        touched = []
+        applied = 0
+        for _ in range(int(n)):
+            if self.ready:
+                started = np.concatenate(self.ready); self.ready = []
+                self.active = np.concatenate((self.active, started))
+                self.started[started] = True
+            act, rev = self.active, self.review
+            if not len(act) and not len(rev): break
+            p = np.minimum(100, pg[act] + rng.integers(8, 17, len(act)))
+            s = stage_codes(p)
+            self.counts += np.bincount(s, minlength=4) - np.bincount(st[act], minlength=4)
+            self.counts[REVIEW] -= len(rev); self.counts[DONE] += len(rev)
+            pg[act] = p; st[act] = s
+            st[rev] = DONE; pg[rev] = 100
+            touched.append(act); touched.append(rev)
+            running = s <= IN_PROGRESS          # "Planned" here means restarted next tick, like before
+            self.active = act[running]
+            self.review = act[s == REVIEW]
+            done = act[s == DONE]
+            done = np.concatenate((rev, done)) if len(done) else rev
+            if len(done): self._done_log.append(done)
+            self._release(done)
+            applied += 1
+        self.changed = np.unique(np.concatenate(touched)) if touched else np.empty(0, dtype=np.intp)
+        self._sync(self.changed)
+        return applied
+
+    def reset(self):
+        self.status[:] = PLANNED; self.progress[:] = 0
+        self._rebuild_queues()
+        self.changed = np.arange(self.n)
+        self._sync(self.changed)
+
+    # ---------- stage indexes ----------
+    def stage_counts(self):
+        return dict(zip(STAGES, self.counts.tolist()))
+
+    def _by_progress(self, idx, k):
+        key = (100 - self.progress[idx].astype(np.int64))*self.n + idx      # progress desc, then plan order
+        if len(idx) > k:
+            part = np.argpartition(key, k - 1)[:k]; idx, key = idx[part], key[part]
+        return idx[np.argsort(key)]
+
+    def _first_unstarted(self, k):
+        u, started = self._unstarted, self.started
+        out = []; i = self._head; step = max(64, 4*k)
+        while i < len(u) and len(out) < k:
+            chunk = u[i:i + step]; keep = chunk[~started[chunk]]
+            if not out and not len(keep): self._head = i + len(chunk)    # all started: never look here again
+            out.extend(keep.tolist()); i += len(chunk); step *= 2
+        return out[:k]
+
+    def top(self, stage, k=8):
+        """Up to `k` task indexes in `stage`, highest progress first (ties in plan order). Done lists the
+        earliest completions; Planned lists restarted tasks, then the first tasks not yet started."""
+        if stage == DONE:
+            out = []
+            for chunk in self._done_log:
+                out.extend(chunk[:k - len(out)].tolist())
+                if len(out) >= k: break
+            return out
+        if stage == REVIEW: return self._by_progress(self.review, k).tolist()
+        act = self.active[self.status[self.active] == stage]
+        out = self._by_progress(act, k).tolist()
+        if stage == PLANNED and len(out) < k: out += self._first_unstarted(k - len(out))
+        return out
+
+    def remaining_deps(self, tid):
+        return int(self.remaining[self.index[tid]])
+
+    # ---------- dict view ----------
+    def _sync(self, changed):
+        if self.tasks is None: return
+        tasks, ids, st, pg = self.tasks, self.ids, self.status, self.progress
+        for i in changed.tolist():
+            t = tasks[ids[i]]
+            t["status"] = STAGES[st[i]]; t["progress"] = int(pg[i])
+
+    def matches(self, tasks):
+        """Whether this engine still mirrors `tasks` (same dict, no tasks added or removed)."""
+        return tasks is self.tasks and len(tasks) == self.n
+
+# ---------- Headless simulation ----------
+def random_dag(n_tasks, max_deps=3, window=50, seed=0):
+    """Layered random DAG: each task depends on up to `max_deps` of the `window` tasks before it."""
+    rng = np.random.default_rng(seed)
+    k = rng.integers(0, max_deps + 1, n_tasks); k[0] = 0
+    dst = np.repeat(np.arange(n_tasks), k)
+    src = dst - 1 - rng.integers(0, window, len(dst))
+    keep = src >= 0
+    return src[keep], dst[keep]
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Simulate execution of a large random task DAG.")
+    p.add_argument("--tasks", type=int, default=100_000)
+    p.add_argument("--max-deps", type=int, default=3)
+    p.add_argument("--ticks", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+    src, dst = random_dag(args.tasks, args.max_deps, seed=args.seed)
+    t0 = time.perf_counter()
+    eng = ExecEngine([f"T{i+1:06}" for i in range(args.tasks)], np.zeros(args.tasks), np.zeros(args.tasks), src, dst)
+    t1 = time.perf_counter()
+    ticks = eng.tick(args.ticks, np.random.default_rng(args.seed))
+    t2 = time.perf_counter()
+    print(f"{args.tasks} tasks, {len(src)} deps: build {1e3*(t1-t0):.1f} ms, {ticks} ticks {1e3*(t2-t1):.1f} ms → {eng.stage_counts()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# journal.py
+# Append-only change journal with periodic checkpoints for OperAI state (no Streamlit import).
+# Files in the state directory, by generation g:
+#   checkpoint-g.zip     full snapshot (snapshot.py format) taken when generation g began
+#   journal-g.jsonl      one JSON object per change made during generation g
+# Saving a change is one appended line. Every `every` changes the caller hands over a fresh
+# snapshot (or a function producing one): a new generation starts at once and the checkpoint is
+# built and written in the background; older files are removed only after it is on disk.
+# Restoring = the newest checkpoint plus a replay of every journal from that generation on
+# (torn lines are skipped).
+
+import os, re, json, tempfile, threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+_NAME = re.compile(r"^(checkpoint|journal)-(\d+)\.(zip|jsonl)$")
+
+def _read_umask():
+    # read once at import: toggling it later races with files other threads are creating
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"): return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0o022); os.umask(umask)
+    return umask
+
+FILE_MODE = 0o666 & ~_read_umask()         # what open() gives the journals
+
+def _atomic_write(path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".ckpt.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data); f.flush(); os.fsync(f.fileno())
+        os.chmod(tmp, FILE_MODE)            # instead of mkstemp's 0600
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+def _end_line(path):
+    # after a crash mid-append, start the next record on a fresh line (restore skips the torn one)
+    try:
+        with open(path, "rb+") as f:
+            if f.seek(0, os.SEEK_END) and (f.seek(-1, os.SEEK_END), f.read(1))[1] != b"\n": f.write(b"\n")
+    except FileNotFoundError:
+        pass
+
+class StateJournal:
+    def __init__(self, root: str, every: int = 500):
+        self.root = root
+        self.every = every
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = None                 # background checkpoint thread
+        gens = self._generations()
+        self.generation = max(gens["journal"] | gens["checkpoint"] | {0})
+        self.pending = 0                    # changes since the last checkpoint
+        path = self._path("journal", self.generation)
+        _end_line(path)
+        self._f = open(path, "a", encoding="utf-8")
+
+    def _path(self, kind, g):
+        return os.path.join(self.root, f"{kind}-{g:06d}.{'zip' if kind == 'checkpoint' else 'jsonl'}")
+
+    def _generations(self):
+        out = {"checkpoint": set(), "journal": set()}
+        for name in os.listdir(self.root):
+            m = _NAME.match(name)
+            if m: out[m.group(1)].add(int(m.group(2)))
+        return out
+
+    # ---------- writing ----------
+    def record(self, op: str, **data) -> bool:
+        """Append one change; returns True once a checkpoint is due."""
+        line = json.dumps({"op": op, **data}, separators=(",", ":"), default=str)
+        with self._lock:
+            self._f.write(line + "\n"); self._f.flush()
+            self.pending += 1
+        return self.pending >= self.every
+
+    def checkpoint(self, snapshot: Union[bytes, Callable[[], bytes]], wait: bool = False):
+        """Start a new generation from `snapshot` (the full state as of now). A callable is called on
+        the writer thread, so it must only read data the caller will not mutate afterwards."""
+        with self._lock:
+            self._join()
+            self.generation += 1; g = self.generation
+            self._f.close()
+            self._f = open(self._path("journal", g), "a", encoding="utf-8")
+            self.pending = 0
+            self._writer = threading.Thread(target=self._write_checkpoint, args=(g, snapshot), name="state-checkpoint", daemon=True)
+            self._writer.start()
+        if wait: self._join()
+
+    def _write_checkpoint(self, g, snapshot):
+        _atomic_write(self._path("checkpoint", g), snapshot() if callable(snapshot) else snapshot)
+        gens = self._generations()
+        for kind, nums in gens.items():
+            for n in nums:
+                if n < g: os.unlink(self._path(kind, n))
+
+    def _join(self):
+        if self._writer is not None: self._writer.join(); self._writer = None
+
+    def close(self):
+        with self._lock:
+            self._join(); self._f.close()
+
+    # ---------- reading ----------
+    def restore(self) -> Tuple[Optional[bytes], List[Dict]]:
+        """(newest checkpoint bytes or None, changes recorded since it, oldest first)."""
+        with self._lock:
+            self._join(); self._f.flush()
+            gens = self._generations()
+            base = max(gens["checkpoint"], default=None)
+            snapshot = None
+            if base is not None:
+                with open(self._path("checkpoint", base), "rb") as f: snapshot = f.read()
+            entries = []
+            for g in sorted(n for n in gens["journal"] if base is None or n >= base):
+                with open(self._path("journal", g), encoding="utf-8") as f:
+                    for line in f:
+                        try: entries.append(json.loads(line))
+                        except json.JSONDecodeError: pass       # torn write
+            self.pending = len(entries)
+        return snapshot, entries
@@ -0,0 +1,110 @@
+# search.py
+# Ranked token search over agents / roles (no Streamlit import).
+# Documents with identical fields (every agent hired into one role) form a group, tokenized once
+# into {token: weight of the heaviest field it occurs in} (title 5 … about 1); postings map
+# token → {group: weight}, so indexing another agent of a known role is one list append. A query
+# token matches every indexed token it is a prefix of, found by bisecting the sorted vocabulary;
+# all query tokens must match (AND) and documents rank by summed weight, exact tokens counting double.
+#   python search.py --agents 50000
+
+import argparse, bisect, re, time
+from typing import Dict, List, Sequence
+
+FIELDS = {"title": 5.0, "cat": 3.0, "skills": 3.0, "tools": 2.0, "tasks": 1.0, "about": 1.0}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+class SearchIndex:
+    def __init__(self, fields: Dict[str, float] = FIELDS):
+        self.fields = fields
+        self.keys = []              # doc key per position
+        self.postings = {}          # token → {group: weight}
+        self.members = []           # group → doc positions
+        self._groups = {}           # field values → group
+        self._vocab = None          # sorted tokens, rebuilt after new tokens appear
+        self._source = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _group(self, doc):
+        sig = tuple(tuple(v) if isinstance(v, list) else v for v in (doc.get(f) for f in self.fields))
+        g = self._groups.get(sig)
+        if g is None:
+            g = self._groups[sig] = len(self.members); self.members.append([])
+            terms = {}
+            for v, w in zip(sig, self.fields.values()):
+                for text in (v if isinstance(v, tuple) else (v,)):
+                    for tok in tokenize(str(text or "")):
+                        if w > terms.get(tok, 0.0): terms[tok] = w
+            for tok, w in terms.items():
+                p = self.postings.get(tok)
+                if p is None: self.postings[tok] = {g: w}; self._vocab = None
+                else: p[g] = w
+        return g
+
+    def add(self, key, doc: Dict) -> int:
+        i = len(self.keys); self.keys.append(key)
+        self.members[self._group(doc)].append(i)
+        return i
+
+    def sync(self, docs: Sequence[Dict], key: str = "id") -> "SearchIndex":
+        """Index whatever was appended to `docs` since the last sync; start over if it is another list or shrank."""
+        if docs is not self._source or len(docs) < len(self.keys):
+            self.keys, self.postings, self.members, self._groups, self._vocab, self._source = [], {}, [], {}, None, docs
+        for d in docs[len(self.keys):]: self.add(d[key], d)
+        return self
+
+    def _expand(self, term):
+        if self._vocab is None: self._vocab = sorted(self.postings)
+        v = self._vocab
+        return v[bisect.bisect_left(v, term):bisect.bisect_left(v, term + "\uffff")]
+
+    def search(self, query: str, limit=None) -> List[int]:
+        """Positions of matching docs, best first (ties in insertion order); every doc for an empty query,
+        none for one with nothing searchable in it ("-", "  ")."""
+        if not query: return list(range(len(self.keys)))
+        terms = tokenize(query)
+        if not terms: return []
+        scores = None
+        for term in terms:
+            hits = {}
+            for tok in self._expand(term):
+                boost = 2.0 if tok == term else 1.0
+                for g, w in self.postings[tok].items():
+                    s = w*boost
+                    if s > hits.get(g, 0.0): hits[g] = s
+            scores = hits if scores is None else {g: scores[g] + s for g, s in hits.items() if g in scores}
+            if not scores: return []
+        hits = [(-s, i) for g, s in scores.items() for i in self.members[g]]
+        hits.sort()
+        return [i for _, i in (hits[:limit] if limit else hits)]
+
+# ---------- Benchmark ----------
+def main(argv=None):
+    import random
+    p = argparse.ArgumentParser(description="Build an agent index and time queries against a linear scan.")
+    p.add_argument("--agents", type=int, default=50_000)
+    p.add_argument("--roles", type=int, default=2000)
+    args = p.parse_args(argv)
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(3000)] + ["menu", "manager", "pricing", "seo", "delivery", "payroll", "inventory"]
+    roles = [{"title": " ".join(rng.sample(words, 2)).title(), "cat": rng.choice(["Ops", "Growth", "Finance", "People"]),
+              "skills": rng.sample(words, 5), "tools": rng.sample(words, 3), "tasks": [" ".join(rng.sample(words, 3))]*4,
+              "about": " ".join(rng.sample(words, 12))} for _ in range(args.roles)]
+    agents = [dict(rng.choice(roles), id=f"a{i}") for i in range(args.agents)]
+    t0 = time.perf_counter(); idx = SearchIndex().sync(agents); t1 = time.perf_counter()
+    queries = ["menu", "man", "seo delivery", "w12", "pricing manager"]
+    t2 = time.perf_counter()
+    hits = [len(idx.search(q)) for q in queries]
+    t3 = time.perf_counter()
+    for q in queries:
+        [a for a in agents if q in a["title"].lower() or any(q in s.lower() for s in a["skills"]) or q in a["cat"].lower()]
+    t4 = time.perf_counter()
+    print(f"{args.agents} agents / {args.roles} roles: build {1e3*(t1-t0):.0f} ms; "
+          f"{len(queries)} queries {1e3*(t3-t2):.1f} ms (hits {hits}) vs scan {1e3*(t4-t3):.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# snapshot.py
+# Binary OperAI state snapshots (no Streamlit import).
+# A snapshot is a zip with `state.json` (small scalars and dicts, compact JSON) and one Parquet
+# file per table under tables/. Entries are written and read one at a time, so a large CRM table
+# never sits next to a JSON copy of itself. Parquet needs pyarrow, which Streamlit already depends on.
+# Object columns Arrow can't type (ints and strings mixed, say, after an edit or an import) are
+# stored as JSON text and listed in the manifest, so they come back as the original values.
+#   python snapshot.py --agents 5000 --rows 100000      # size / speed vs. the old JSON export
+
+import argparse, io, json, time, zipfile
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+FORMAT = "operai-snapshot/1"
+
+def is_snapshot(data: bytes) -> bool:
+    return data[:4] == b"PK\x03\x04"
+
+def _mixed(col: pd.Series) -> bool:
+    if col.dtype != object: return False
+    try:
+        pa.array(col, from_pandas=True); return False
+    except (pa.ArrowException, TypeError, ValueError):
+        return True
+
+def _parquet(df: pd.DataFrame) -> Tuple[bytes, List[str]]:
+    buf = io.BytesIO()
+    try:
+        df.to_parquet(buf, index=False, compression="zstd")
+        return buf.getvalue(), []
+    except (pa.ArrowException, TypeError, ValueError):
+        mixed = [c for c in df.columns if _mixed(df[c])]
+        if not mixed: raise
+    df = df.copy()
+    for c in mixed:
+        df[c] = [None if v is None else json.dumps(v, default=str) for v in df[c]]
+    buf = io.BytesIO(); df.to_parquet(buf, index=False, compression="zstd")
+    return buf.getvalue(), mixed
+
+def write_snapshot(f, state: Dict, tables: Dict[str, pd.DataFrame]):
+    """Write to a path or binary file object. Tables go in as-is; list-valued columns are fine."""
+    with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as z:
+        manifest = {"format": FORMAT, "tables": list(tables), "json_columns": {}}
+        for name, df in tables.items():
+            data, mixed = _parquet(df)
+            if mixed: manifest["json_columns"][name] = mixed
+            z.writestr(f"tables/{name}.parquet", data, compress_type=zipfile.ZIP_STORED)
+        z.writestr("state.json", json.dumps({"manifest": manifest, **state}, separators=(",", ":"), default=str))
+
+def _lists(df: pd.DataFrame) -> pd.DataFrame:
+    # Parquet list columns come back as ndarrays; the app expects plain lists
+    for c in df.columns:
+        # check every cell: a null first row doesn't mean the column holds no lists
+        if df[c].dtype == object and any(isinstance(v, np.ndarray) for v in df[c]):
+            df[c] = [v.tolist() if isinstance(v, np.ndarray) else v for v in df[c]]
+    return df
+
+def read_snapshot(f) -> Tuple[Dict, Dict[str, pd.DataFrame]]:
+    with zipfile.ZipFile(f) as z:
+        state = json.loads(z.read("state.json"))
+        manifest = state.pop("manifest", {})
+        if manifest.get("format") != FORMAT:
+            raise ValueError(f"Not an OperAI snapshot ({manifest.get('format')!r})")
+        tables = {}
+        for name in manifest["tables"]:
+            with z.open(f"tables/{name}.parquet") as fh:
+                df = _lists(pd.read_parquet(io.BytesIO(fh.read())))
+            for c in manifest.get("json_columns", {}).get(name, []):
+                df[c] = [json.loads(v) if isinstance(v, str) else None for v in df[c]]
+            tables[name] = df
+    return state, tables
+
+# ---------- Benchmark ----------
+def main(argv=None):
+    import base64
+    from PIL import Image
+    p = argparse.ArgumentParser(description="Compare snapshot size and speed with the JSON export.")
+    p.add_argument("--agents", type=int, default=2000)
+    p.add_argument("--rows", type=int, default=50_000, help="CRM customers")
+    args = p.parse_args(argv)
+    rng = np.random.default_rng(0)
+    png = io.BytesIO(); Image.new("RGB", (160, 160), "#4B8BF4").save(png, format="PNG")
+    agents = [{"id": f"a{i}", "name": f"Agent {i}", "title": "Menu Manager", "skills": ["menu", "pricing"], "avatar_bg": "#4B8BF4"}
+              for i in range(args.agents)]
+    crm = pd.DataFrame({"id": [f"c{i}" for i in range(args.rows)], "name": [f"Customer {i}" for i in range(args.rows)],
+                        "segment": rng.choice(["VIP", "New", "Lapsed"], args.rows), "visits_30d": rng.integers(0, 9, args.rows)})
+    t0 = time.perf_counter()
+    old = json.dumps({"agents": [{**a, "avatar_b64": base64.b64encode(png.getvalue()).decode()} for a in agents],
+                      "crm_customers": crm.to_dict(orient="records")}, indent=2)
+    t1 = time.perf_counter()
+    buf = io.BytesIO(); write_snapshot(buf, {}, {"agents": pd.DataFrame(agents), "crm_customers": crm})
+    t2 = time.perf_counter()
+    json.loads(old); t3 = time.perf_counter()
+    read_snapshot(io.BytesIO(buf.getvalue())); t4 = time.perf_counter()
+    print(f"json: {len(old)/1e6:.1f} MB, write {1e3*(t1-t0):.0f} ms, parse {1e3*(t3-t2):.0f} ms (before avatar decode)")
+    print(f"zip:  {buf.tell()/1e6:.2f} MB, write {1e3*(t2-t1):.0f} ms, read {1e3*(t4-t3):.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,20 @@
 # also: small guards, cleaner exports, and table seeds
 
 import streamlit as st
-import random, textwrap, json, uuid, base64, io, math
+import os, re, random, textwrap, json, uuid, base64, io, math, functools, zlib
 from datetime import datetime, timedelta, date, time
 import pandas as pd
+import numpy as np
 import altair as alt
 from PIL import Image, ImageDraw, ImageFont
 from typing import List, Dict, Optional
+from downsample import downsample
+from execution import ExecEngine, STAGES
+from workflows import AgentIndex, compile_templates
+from timeline import timeline_frame
+from snapshot import is_snapshot, read_snapshot, write_snapshot
+from journal import StateJournal
+from search import SearchIndex
 
 st.set_page_config(page_title="OperAI — Your Operational AI Virtual Company!", page_icon="🤖", layout="wide")
 
@@ -126,18 +134,25 @@ random.seed(st.session_state.seed)
 # ============
 # Helpers: Avatars & (De)Serialize
 # ============
-def initials_avatar(name: str, badge: str, size: int = 160) -> Image.Image:
-    palette = ["#4B8BF4","#10B981","#F59E0B","#EC4899","#8B5CF6","#06B6D4"]
-    bg = random.choice(palette)
+# Agents only carry their avatar background color; images are drawn when first shown and the
+# PNG bytes kept in a process-wide LRU, so generating or loading a roster draws nothing.
+AVATAR_PALETTE = ["#4B8BF4","#10B981","#F59E0B","#EC4899","#8B5CF6","#06B6D4"]
+AVATAR_CACHE_SIZE = 1024
+
+@functools.lru_cache(maxsize=None)
+def avatar_fonts(size: int):
+    try:
+        return ImageFont.truetype("Arial.ttf", int(size*0.45)), ImageFont.truetype("Arial.ttf", int(size*0.14))
+    except OSError:
+        return ImageFont.load_default(), ImageFont.load_default()
+
+def initials_avatar(name: str, badge: str, size: int = 160, bg: Optional[str] = None) -> Image.Image:
+    bg = bg or AVATAR_PALETTE[zlib.crc32(name.encode()) % len(AVATAR_PALETTE)]
     img = Image.new("RGB", (size, size), bg)
     d = ImageDraw.Draw(img)
     d.ellipse([4,4,size-4,size-4], outline="#ffffff", width=6)
     initials = "".join([p[0] for p in name.split()[:2]]).upper() or "AI"
-    try:
-        font = ImageFont.truetype("Arial.ttf", int(size*0.45))
-        small = ImageFont.truetype("Arial.ttf", int(size*0.14))
-    except:
-        font = ImageFont.load_default(); small = ImageFont.load_default()
+    font, small = avatar_fonts(size)
     w,h = d.textbbox((0,0), initials, font=font)[2:]
     d.text(((size-w)/2, (size-h)/2-8), initials, fill="white", font=font)
     label = badge.split()[0][:10].upper()
@@ -147,15 +162,21 @@ def initials_avatar(name: str, badge: str, size: int = 160) -> Image.Image:
     d.text((16, size-(bh+pad*2)-10+pad), label, fill="white", font=small)
     return img
 
-def img_to_b64(img: Image.Image) -> str:
-    buf = io.BytesIO(); img.save(buf, format="PNG")
-    return base64.b64encode(buf.getvalue()).decode()
+@functools.lru_cache(maxsize=AVATAR_CACHE_SIZE)
+def avatar_png(name: str, badge: str, size: int = 160, bg: Optional[str] = None) -> bytes:
+    buf = io.BytesIO(); initials_avatar(name, badge, size, bg).save(buf, format="PNG")
+    return buf.getvalue()
 
-def b64_to_img(s: str) -> Image.Image:
+def agent_avatar(ag: Dict, size: int = 160) -> bytes:
+    return avatar_png(ag["name"], ag["title"], size, ag.get("avatar_bg"))
+
+def b64_avatar_bg(s: str) -> Optional[str]:
+    """Background color of a base64 PNG avatar from an old JSON export (the corner is never drawn over)."""
     try:
-        return Image.open(io.BytesIO(base64.b64decode(s)))
+        r, g, b = Image.open(io.BytesIO(base64.b64decode(s))).convert("RGB").getpixel((1, 1))
+        return f"#{r:02X}{g:02X}{b:02X}"
     except Exception:
-        return initials_avatar("AI", "Agent")
+        return None
 
 def fake_name():
     first = random.choice(["Sophia","Liam","Olivia","Noah","Ava","Ethan","Mia","Lucas","Isabella","Leo","Amelia","Mason","Chloe","Aiden","Zoe","Aria","Ella","Luna","Nora","Kai"])
@@ -234,7 +255,7 @@ DEFAULT_ROLE_KEYS = [
 def make_agent(role_key: str) -> Dict:
     role = ROLE_LIBRARY[role_key]
     name = fake_name(); email = f"{name.lower().replace(' ','.')}@{AGENT_EMAIL_DOMAIN}"
-    avatar = initials_avatar(name, role["title"])
+    bg = random.choice(AVATAR_PALETTE)
     agent_id = f"{role_key}-{random.randint(1000,9999)}"
     st.session_state.emails[agent_id] = email
     st.session_state.chats.setdefault(agent_id, [
@@ -244,7 +265,7 @@ def make_agent(role_key: str) -> Dict:
         "id": agent_id, "name": name, "email": email,
         "role_key": role_key, "title": role["title"], "cat": role["cat"],
         "skills": role["skills"], "tools": role["tools"], "tasks": role["tasks"],
-        "about": role["about"], "avatar": avatar,
+        "about": role["about"], "avatar_bg": bg,
     }
 
 # ==========================
@@ -315,26 +336,18 @@ def infer_intents(txt: str) -> List[str]:
 
 def compile_workflow_from_needs(needs_text: str, agents: List[Dict]) -> str:
     intents = infer_intents(needs_text)
-    wf_id = f"WF-{int(datetime.utcnow().timestamp())}"
-    tasks_map = {}
-    for tpl_key in intents:
-        tpl = TEMPLATES[tpl_key]
-        for item in tpl["tasks"]:
-            owner = next((a["id"] for a in agents if a["role_key"] == item["owner"]), None)
-            if not owner:
-                owner = next((a["id"] for a in agents if a["cat"] == ROLE_LIBRARY[item["owner"]]["cat"]), agents[0]["id"])
-            tid = f"T{len(st.session_state.execution)+1:04}"
-            tasks_map[item["title"]] = tid
-            st.session_state.execution[tid] = {
-                "id": tid, "title": item["title"], "owner": owner,
-                "status": "Planned", "progress": 0, "depends_on": item["depends_on"][:]
-            }
-    for t in st.session_state.execution.values():
-        t["depends_on"] = [tasks_map[name] for name in t["depends_on"] if name in tasks_map]
-    st.session_state.workflows[wf_id] = {
-        "name": " + ".join([TEMPLATES[k]["name"] for k in intents]),
-        "task_ids": list(tasks_map.values())
-    }
+    ex = st.session_state.execution
+    owners = AgentIndex(agents, {k: r["cat"] for k, r in ROLE_LIBRARY.items()})
+    dag = compile_templates(intents, TEMPLATES, owners, len(ex) + 1)
+    ex.update(dag.to_execution())
+    wf_id = base = f"WF-{int(datetime.utcnow().timestamp())}"
+    k = 1
+    while wf_id in st.session_state.workflows:
+        k += 1; wf_id = f"{base}-{k}"
+    st.session_state.workflows[wf_id] = {"name": dag.name, "task_ids": dag.ids}
+    journal("workflow", wf_id=wf_id, workflow=st.session_state.workflows[wf_id], tasks=[ex[t] for t in dag.ids])
+    if dag.collisions:
+        create_alert("warning", f"Task titles shared by several templates (dependencies kept per template): {', '.join(sorted(set(dag.collisions)))}")
     create_alert("info", f"Compiled workflow: {st.session_state.workflows[wf_id]['name']}")
     return wf_id
 
@@ -342,18 +355,9 @@ def compile_workflow_from_needs(needs_text: str, agents: List[Dict]) -> str:
 # Timeline (Gantt)
 # =======================
 def build_timeline_from_execution() -> pd.DataFrame:
-    rows = []
-    start = datetime.today().date()
-    for t in st.session_state.execution.values():
-        idx = int(t["id"][1:])
-        week = (idx % 4) + 1
-        sd = start + timedelta(days=(week-1)*7 + random.randint(0,2))
-        ed = sd + timedelta(days=2 + random.randint(0,2))
-        ag = next((a for a in st.session_state.agents if a["id"] == t["owner"]), None)
-        rows.append({"Agent": ag["name"] if ag else "Agent", "Role": ag["title"] if ag else "Role",
-                     "Task": t["title"], "Start": pd.to_datetime(sd), "End": pd.to_datetime(ed), "Week": week})
-    df = pd.DataFrame(rows)
-    st.session_state.timeline_df = df.sort_values(["Start","Agent","Task"]).reset_index(drop=True)
+    # one task at a time per agent; critical / slack are measured on that levelled schedule (timeline.py)
+    df = timeline_frame(st.session_state.execution, st.session_state.agents, np.random.default_rng(random.getrandbits(32)))
+    st.session_state.timeline_df = df
 
 def gantt_chart(df: pd.DataFrame):
     if df.empty:
@@ -361,7 +365,9 @@ def gantt_chart(df: pd.DataFrame):
     chart = alt.Chart(df).mark_bar().encode(
         x="Start:T", x2="End:T", y=alt.Y("Agent:N", sort="-x"),
         color=alt.Color("Week:N", legend=None),
-        tooltip=["Agent","Role","Task","Start","End","Week"]
+        stroke=alt.condition("datum.Critical", alt.value("#d62728"), alt.value(None)),
+        strokeWidth=alt.value(2),
+        tooltip=["Agent","Role","Task","Start","End","Week","Critical","Slack"]
     ).properties(height=480)
     st.altair_chart(chart, use_container_width=True)
 
@@ -374,33 +380,42 @@ def task_stage(pct: int) -> str:
     if pct >= 35:  return "In Progress"
     return "Planned"
 
+def exec_engine() -> ExecEngine:
+    """Array-backed engine mirroring st.session_state.execution; rebuilt when tasks are added or the dict is replaced."""
+    eng = st.session_state.get("exec_engine")
+    if eng is None or not eng.matches(st.session_state.execution):
+        eng = st.session_state.exec_engine = ExecEngine.from_tasks(st.session_state.execution)
+    return eng
+
 def exec_tick(n=1):
-    ex = st.session_state.execution
-    for _ in range(n):
-        for t in ex.values():
-            if t["status"] == "Planned" and all(ex[d]["status"] == "Done" for d in t["depends_on"]):
-                t["status"] = "In Progress"
-        for t in ex.values():
-            if t["status"] == "In Progress":
-                t["progress"] = min(100, t["progress"] + random.randint(8,16))
-                t["status"] = task_stage(t["progress"])
-            elif t["status"] == "Review":
-                t["status"] = "Done"; t["progress"] = 100
-
-def kanban_snapshot():
-    ex = st.session_state.execution
-    stages = {"Planned":[], "In Progress":[], "Review":[], "Done":[]}
-    for t in ex.values(): stages[t["status"]].append((t["id"], t["title"], t["progress"]))
+    eng = exec_engine()
+    eng.tick(n, np.random.default_rng(random.getrandbits(32)))
+    if len(eng.changed):
+        ts = [st.session_state.execution[eng.ids[i]] for i in eng.changed.tolist()]
+        journal("tasks", ids=[t["id"] for t in ts], status=[t["status"] for t in ts], progress=[t["progress"] for t in ts])
+
+def kanban_snapshot(k: int = 8):
+    """stage → (task count, top-k (id, title, progress) by progress), read from the engine's stage indexes."""
+    eng = exec_engine(); ex = st.session_state.execution
+    counts = eng.stage_counts()
+    stages = {}
+    for code, name in enumerate(STAGES):
+        top = [ex[eng.ids[i]] for i in eng.top(code, k)]
+        stages[name] = (counts[name], [(t["id"], t["title"], t["progress"]) for t in top])
     return stages
 
 # =======================
 # Alerts / Audit
 # =======================
-def create_alert(level: str, text: str):
-    st.session_state.alerts.append({"ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "level": level, "text": text})
+def push_alert(alert: Dict):
+    st.session_state.alerts.append(alert)
     if len(st.session_state.alerts) > 200:
         st.session_state.alerts = st.session_state.alerts[-200:]
 
+def create_alert(level: str, text: str):
+    alert = {"ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "level": level, "text": text}
+    push_alert(alert); journal("alert", alert=alert)
+
 # =======================
 # KPIs
 # =======================
@@ -408,7 +423,7 @@ def compute_kpis() -> Dict[str,str]:
     ex = st.session_state.execution
     if not ex: 
         return {"Tasks Completed":"0/0 (0%)","Orders Today":"0","On-Time Delivery":"—","Campaign ROI":"—","Revenue":"$0","LTV":"—","Active Locs":"0"}
-    total = len(ex); done = sum(1 for t in ex.values() if t["status"]=="Done")
+    total = len(ex); done = exec_engine().stage_counts()["Done"]
     pct = int(done/total*100) if total else 0
     orders = 120 + done*3 + random.randint(-8,12)
     on_time = min(99, 90 + done//3)
@@ -426,8 +441,9 @@ def compute_kpis() -> Dict[str,str]:
     "Active Locs": str(active_locs)
 }
 
-def sparkline(values, title):
+def sparkline(values, title, max_points: int = 120):
     df = pd.DataFrame({"x": list(range(len(values))), "y": values})
+    if len(df) > max_points: df = df.iloc[downsample(df["x"].values, df["y"].values, max_points)]
     ch = alt.Chart(df).mark_line(point=False).encode(x="x:Q", y="y:Q").properties(height=60)
     st.caption(title); st.altair_chart(ch, use_container_width=True)
 
@@ -466,7 +482,9 @@ SAMPLE_UPDATES = [
     "QA synthetic order succeeded in staging.",
 ]
 def get_fresh_update() -> str: return f"{datetime.now().strftime('%H:%M:%S')} — {random.choice(SAMPLE_UPDATES)}"
-def record_agent_update(agent_id: str): st.session_state.last_updates[agent_id] = get_fresh_update()
+def record_agent_updates(agent_ids: List[str]):
+    ups = {aid: get_fresh_update() for aid in agent_ids}
+    st.session_state.last_updates.update(ups); journal("updates", updates=ups)
 
 def build_ics(agent_name: str, title: str, start_dt: datetime, duration_min: int, notes: str) -> str:
     dtstamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
@@ -487,11 +505,21 @@ def jump_to_comms(agent_id: str, tab: str):
     st.session_state.comms_target_agent = agent_id
     jump_to("6) Comms")
 
+def agent_index() -> SearchIndex:
+    """Search index over st.session_state.agents; picks up hires incrementally, rebuilt if the list is replaced."""
+    idx = st.session_state.get("agent_index")
+    if idx is None: idx = st.session_state.agent_index = SearchIndex()
+    return idx.sync(st.session_state.agents)
+
+@st.cache_resource
+def role_index() -> SearchIndex:
+    return SearchIndex().sync([dict(r, key=k) for k, r in ROLE_LIBRARY.items()], key="key")
+
 def filtered_agents():
     ags = st.session_state.agents or []
-    q = st.session_state.get("q","").lower()
-    if q:
-        ags = [a for a in ags if q in a["title"].lower() or any(q in s.lower() for s in a["skills"]) or q in a["cat"].lower()]
+    q = st.session_state.get("q","")
+    if q.strip():
+        ags = [ags[i] for i in agent_index().search(q)]   # ranked; prefix match on title, skills, tools, tasks, about, category
     picks = st.session_state.get("pick",[])
     if picks: ags = [a for a in ags if a["cat"] in picks]
     if st.session_state.get("fav_only"): ags = [a for a in ags if a["id"] in st.session_state.favorites]
@@ -501,55 +529,149 @@ def assign_task(owner_id: str, title: str):
     if not title.strip(): return
     tid = f"T{len(st.session_state.execution)+1:04}"
     st.session_state.execution[tid] = {"id":tid, "title":title.strip(), "owner":owner_id, "status":"Planned", "progress":0, "depends_on":[]}
+    journal("task", task=st.session_state.execution[tid])
     create_alert("info", f"Task created: {title}")
 
-SERIALIZE_KEYS = ["founder_name","business_name","business_needs","workflows","execution","last_updates"]
-def serialize_state():
-    def agent_to_json(a):
-        obj = a.copy()
-        obj["avatar_b64"] = img_to_b64(a["avatar"])
-        obj["avatar"] = None
-        return obj
-    data = {k: st.session_state.get(k) for k in SERIALIZE_KEYS}
-    data["agents"] = [agent_to_json(a) for a in st.session_state.agents]
-    data["emails"] = st.session_state.emails
-    data["favorites"] = list(st.session_state.favorites)
-    # tables
-    for name in ["menu_items","inventory","vendors","locations","employees","crm_customers","experiments","connectors","payouts"]:
-        data[name] = getattr(st.session_state, name).to_dict(orient="records")
-    data["alerts"] = st.session_state.alerts[-100:]
-    return data
-
-def load_state(data: Dict):
+SERIALIZE_KEYS = ["founder_name","business_name","business_needs","workflows","last_updates","chats"]
+TABLE_KEYS = ["menu_items","inventory","vendors","locations","employees","crm_customers","experiments","connectors","payouts"]
+def capture_state():
+    """Copies of everything a snapshot holds, deep enough that later reruns can't change them.
+    Cheap next to pack_state, which can then run off the script thread."""
+    ss = st.session_state
+    data = {k: ss.get(k) for k in SERIALIZE_KEYS}
+    data.update(workflows=dict(ss.workflows), last_updates=dict(ss.last_updates),
+                chats={k: list(v) for k, v in ss.chats.items()})
+    data["emails"] = dict(ss.emails)
+    data["favorites"] = list(ss.favorites)
+    data["alerts"] = ss.alerts[-100:]
+    rows = {"agents": list(ss.agents), "execution": [dict(t) for t in ss.execution.values()]}
+    tables = {name: getattr(ss, name).copy() for name in TABLE_KEYS}
+    return data, rows, tables
+
+def pack_state(data, rows, tables) -> bytes:
+    """Zip snapshot (see snapshot.py); agents keep only their avatar background color."""
+    tables = {"agents": pd.DataFrame(rows["agents"]), "execution": pd.DataFrame(rows["execution"]), **tables}
+    buf = io.BytesIO(); write_snapshot(buf, data, tables)
+    return buf.getvalue()
+
+def serialize_state() -> bytes:
+    return pack_state(*capture_state())
+
+def load_state(raw: bytes):
+    if is_snapshot(raw):
+        data, tables = read_snapshot(io.BytesIO(raw))
+        agents = tables.pop("agents").to_dict(orient="records")
+        execution = {t["id"]: t for t in tables.pop("execution").to_dict(orient="records")}
+    else:   # JSON export from before the snapshot format
+        data = json.loads(raw)
+        agents = data.get("agents", [])
+        for a in agents: a["avatar_bg"] = b64_avatar_bg(a.pop("avatar_b64", "")); a.pop("avatar", None)
+        execution = data.get("execution", {})
+        tables = {k: pd.DataFrame(data.get(k, [])) for k in TABLE_KEYS}
     st.session_state.founder_name = data.get("founder_name","")
     st.session_state.business_name = data.get("business_name","")
     st.session_state.business_needs = data.get("business_needs","")
     st.session_state.workflows = data.get("workflows",{})
-    st.session_state.execution = data.get("execution",{})
+    st.session_state.execution = execution
     st.session_state.last_updates = data.get("last_updates",{})
-    # agents
-    st.session_state.agents = []
-    for a in data.get("agents", []):
-        img = b64_to_img(a.get("avatar_b64",""))
-        a["avatar"] = img
-        a.pop("avatar_b64", None)
-        st.session_state.agents.append(a)
+    st.session_state.chats = data.get("chats",{})
+    st.session_state.agents = agents
     # misc
     st.session_state.emails = data.get("emails",{})
     st.session_state.favorites = set(data.get("favorites",[]))
     # tables
-    def dfget(key): return pd.DataFrame(data.get(key, []))
-    st.session_state.menu_items = dfget("menu_items")
-    st.session_state.inventory = dfget("inventory")
-    st.session_state.vendors = dfget("vendors")
-    st.session_state.locations = dfget("locations")
-    st.session_state.employees = dfget("employees")
-    st.session_state.crm_customers = dfget("crm_customers")
-    st.session_state.experiments = dfget("experiments")
-    st.session_state.connectors = dfget("connectors")
-    st.session_state.payouts = dfget("payouts")
+    for name in TABLE_KEYS: setattr(st.session_state, name, tables.get(name, pd.DataFrame()))
     st.session_state.alerts = data.get("alerts", [])
 
+# =======================
+# Persistence (journal + checkpoints)
+# =======================
+# Set OPERAI_STATE_DIR to persist continuously: every change below is appended to a journal and
+# the full snapshot is rewritten every 500 changes (journal.py). Each browser session gets its own
+# directory, OPERAI_STATE_DIR/<session>, named by the ?session= URL parameter: reloading or
+# bookmarking the URL restores that session, a new tab without the parameter starts a new one.
+# The snapshot is copied on the script thread and packed / written on the journal's thread.
+STATE_DIR = os.environ.get("OPERAI_STATE_DIR")
+
+def state_session() -> str:
+    sid = st.session_state.get("state_session")
+    if sid is None:
+        sid = st.query_params.get("session", "")
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", sid): sid = uuid.uuid4().hex[:12]
+        st.query_params["session"] = sid
+        st.session_state.state_session = sid
+    return sid
+
+@st.cache_resource
+def state_journal(root: str) -> StateJournal:
+    return StateJournal(root)
+
+def session_journal() -> StateJournal:
+    return state_journal(os.path.join(STATE_DIR, state_session()))
+
+def checkpoint_state():
+    if STATE_DIR:
+        snap = capture_state()
+        session_journal().checkpoint(lambda: pack_state(*snap))
+
+def journal(op: str, **data):
+    if STATE_DIR and session_journal().record(op, **data): checkpoint_state()
+
+def set_profile(field: str, value: str):
+    # founder / business inputs come back on every rerun; journal only actual edits
+    if st.session_state.get(field) != value:
+        st.session_state[field] = value; journal("profile", field=field, value=value)
+
+def add_row(table: str, row: Dict):
+    df = getattr(st.session_state, table)
+    df.loc[len(df)] = row
+    journal("row", table=table, row=row)
+
+def apply_change(e: Dict):
+    ss, op = st.session_state, e["op"]
+    if op == "tasks":
+        for tid, status, pct in zip(e["ids"], e["status"], e["progress"]):
+            ss.execution[tid]["status"] = status; ss.execution[tid]["progress"] = pct
+    elif op == "reset_execution":
+        for t in ss.execution.values(): t["status"] = "Planned"; t["progress"] = 0
+    elif op == "workflow":
+        ss.execution.update({t["id"]: t for t in e["tasks"]}); ss.workflows[e["wf_id"]] = e["workflow"]
+    elif op == "task": ss.execution[e["task"]["id"]] = e["task"]
+    elif op == "row":
+        df = getattr(ss, e["table"]); df.loc[len(df)] = e["row"]
+    elif op == "alert": push_alert(e["alert"])
+    elif op == "chat": ss.chats.setdefault(e["agent"], []).append(e["msg"])
+    elif op == "chat_reset": ss.chats[e["agent"]] = [e["msg"]]
+    elif op == "agent":
+        a = e["agent"]; ss.agents.append(a); ss.emails[a["id"]] = a["email"]; ss.chats.setdefault(a["id"], e["chat"])
+    elif op == "favorite":
+        if e["on"]: ss.favorites.add(e["agent"])
+        else: ss.favorites.discard(e["agent"])
+    elif op == "updates": ss.last_updates.update(e["updates"])
+    elif op == "updates_clear": ss.last_updates = {}
+    elif op == "profile": ss[e["field"]] = e["value"]
+
+if STATE_DIR and "journal_restored" not in st.session_state:
+    st.session_state.journal_restored = True
+    snap, changes = session_journal().restore()
+    if snap: load_state(snap)
+    for e in changes: apply_change(e)
+    if st.session_state.execution: build_timeline_from_execution()
+
+PAGE_SIZES = [6, 12, 24, 48, 96]
+def paginate(items: List, key: str, default_size: int = 12) -> List:
+    """The current page of `items`; draws per-page / page controls (state kept under `key`)."""
+    n = len(items)
+    if n <= PAGE_SIZES[0]: return items
+    c1, c2, c3 = st.columns([1,1,3])
+    size = c1.selectbox("Per page", PAGE_SIZES, index=PAGE_SIZES.index(default_size), key=f"{key}_size")
+    pages = math.ceil(n/size)
+    if st.session_state.get(f"{key}_page", 1) > pages: st.session_state[f"{key}_page"] = pages   # filter shrank the list
+    page = c2.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    lo = (page-1)*size
+    c3.caption(f"Showing {lo+1}–{min(n, lo+size)} of {n}")
+    return items[lo:lo+size]
+
 def top_filters():
     st.markdown('<div class="card">', unsafe_allow_html=True)
     c1, c2, c3, c4, c5 = st.columns([3,2,2,2,2])
@@ -557,12 +679,11 @@ def top_filters():
     cats = sorted({v["cat"] for v in ROLE_LIBRARY.values()})
     st.session_state.pick = c2.multiselect("Filter by category", options=cats, default=st.session_state.get("pick",[]))
     st.session_state.fav_only = c3.checkbox("Favorites only ★", value=st.session_state.get("fav_only", False))
-    if c4.button("⬇️ Export State (.json)"):
-        data = serialize_state()
-        st.download_button("Download", data=json.dumps(data, indent=2), file_name="operai_state.json", mime="application/json")
-    uploaded = c5.file_uploader("Load state (.json)", type=["json"], label_visibility="collapsed")
+    if c4.button("⬇️ Export State (.zip)"):
+        st.download_button("Download", data=serialize_state(), file_name="operai_state.zip", mime="application/zip")
+    uploaded = c5.file_uploader("Load state (.zip)", type=["zip","json"], label_visibility="collapsed")
     if uploaded:
-        load_state(json.loads(uploaded.read()))
+        load_state(uploaded.getvalue()); checkpoint_state()
         st.success("State loaded.")
         st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
@@ -605,19 +726,19 @@ if st.session_state.nav.startswith("1"):
         st.subheader("Founder Input")
         st.write("Describe your business. OperAI will generate a specialized AI team, compile workflows (DAG), and set up execution, KPIs, and modules.")
         c1,c2 = st.columns(2)
-        st.session_state.founder_name = c1.text_input("Founder Name", value=st.session_state.founder_name or "Alice Founder")
-        st.session_state.business_name = c2.text_input("Business Name", value=st.session_state.business_name or "Aurora Bistro")
+        set_profile("founder_name", c1.text_input("Founder Name", value=st.session_state.founder_name or "Alice Founder"))
+        set_profile("business_name", c2.text_input("Business Name", value=st.session_state.business_name or "Aurora Bistro"))
         placeholder = textwrap.dedent("""
             I opened a restaurant with two locations and need a reservation site with confirmations and calendar sync,
             an online ordering funnel with POS integration, promos and delivery logistics, lifecycle email/CRM,
             HR hiring & onboarding, inventory & vendor setup, finance close, and security/compliance.
         """).strip()
-        st.session_state.business_needs = st.text_area("Business Needs", value=st.session_state.business_needs or placeholder, height=140)
+        set_profile("business_needs", st.text_area("Business Needs", value=st.session_state.business_needs or placeholder, height=140))
         colg1, colg2, colg3 = st.columns([1,1,1])
         if colg1.button("Generate My AI Team ▶"):
             st.session_state.agents = [make_agent(k) for k in DEFAULT_ROLE_KEYS]
             wf_id = compile_workflow_from_needs(st.session_state.business_needs, st.session_state.agents)
-            build_timeline_from_execution()
+            build_timeline_from_execution(); checkpoint_state()
             st.success(f"Team ready. Planned workflow: {st.session_state.workflows[wf_id]['name']}")
         if colg2.button("Add HR + Inventory Workflows"):
             for wf_key in ["wf_hr_hiring","wf_inventory_setup"]:
@@ -626,8 +747,8 @@ if st.session_state.nav.startswith("1"):
             st.success("Added HR & Inventory workflows.")
         if colg3.button("Reset All"):
             for k in list(st.session_state.keys()):
-                if k not in ["seed"]: del st.session_state[k]
-            ensure_state(); st.rerun()
+                if k not in ["seed","journal_restored","state_session"]: del st.session_state[k]
+            ensure_state(); checkpoint_state(); st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
 # 2) Team
@@ -641,13 +762,13 @@ elif st.session_state.nav.startswith("2"):
         if not ags: st.info("No roles match your filter.")
         else:
             cols = st.columns(2)
-            for i, ag in enumerate(ags):
+            for i, ag in enumerate(paginate(ags, "team_pg")):
                 with cols[i % 2]:
                     with st.container():
                         st.markdown('<div class="card">', unsafe_allow_html=True)
                         top = st.columns([1,3,1])
                         with top[0]:
-                            st.image(ag["avatar"], caption=ag["name"], use_container_width=True)
+                            st.image(agent_avatar(ag), caption=ag["name"], use_container_width=True)
                         with top[1]:
                             st.subheader(ag["title"]); st.markdown(f'<span class="badge">{ag["cat"]}</span>', unsafe_allow_html=True)
                             st.write(ag["about"])
@@ -669,13 +790,13 @@ elif st.session_state.nav.startswith("2"):
                             if st.button(("★ Unpin" if fav else "☆ Pin"), key=f"fav_{ag['id']}"):
                                 if fav: st.session_state.favorites.remove(ag["id"])
                                 else: st.session_state.favorites.add(ag["id"])
-                                st.rerun()
+                                journal("favorite", agent=ag["id"], on=not fav); st.rerun()
                             st.caption(f"`{ag['email']}`")
                         actions = st.columns(3)
                         if actions[0].button("💬 Chat", key=f"chat_{ag['id']}"): jump_to_comms(ag["id"], "Chat")
                         if actions[1].button("📅 Meeting", key=f"meet_{ag['id']}"): jump_to_comms(ag["id"], "Meetings")
                         if actions[2].button("🔄 Get Update", key=f"upd_{ag['id']}"):
-                            record_agent_update(ag["id"]); st.toast(f"Latest update from {ag['name']}")
+                            record_agent_updates([ag["id"]]); st.toast(f"Latest update from {ag['name']}")
                         upd = st.session_state.last_updates.get(ag["id"]); 
                         if upd: st.caption(f"**Latest Update:** {upd}")
                         st.markdown('</div>', unsafe_allow_html=True)
@@ -686,7 +807,8 @@ elif st.session_state.nav.startswith("3"):
     st.subheader("Project Timeline")
     if st.session_state.timeline_df.empty: st.warning("No timeline yet. Generate your team first.")
     else:
-        st.caption("4-week roadmap (color by week). Hover for details.")
+        weeks = int(st.session_state.timeline_df["Week"].max())
+        st.caption(f"{weeks}-week roadmap (color by week, tasks that would delay the finish outlined in red). Hover for details.")
         gantt_chart(st.session_state.timeline_df)
         with st.expander("Table View"): st.dataframe(st.session_state.timeline_df, use_container_width=True)
 
@@ -702,10 +824,10 @@ elif st.session_state.nav.startswith("4"):
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.markdown("#### Kanban Snapshot")
             st.markdown('<div class="kanban">', unsafe_allow_html=True)
-            for name in ["Planned","In Progress","Review","Done"]:
+            for name, (count, top) in stages.items():
                 st.markdown('<div class="kcol">', unsafe_allow_html=True)
-                st.markdown(f"<h5>{name} <span class='kcount'>({len(stages[name])})</span></h5>", unsafe_allow_html=True)
-                for tid, title, pct in sorted(stages[name], key=lambda x: -x[2])[:8]:
+                st.markdown(f"<h5>{name} <span class='kcount'>({count})</span></h5>", unsafe_allow_html=True)
+                for tid, title, pct in top:
                     st.markdown(f"<div class='kcard'>{title} — <b>{pct}%</b> <span class='small'>({tid})</span></div>", unsafe_allow_html=True)
                 st.markdown('</div>', unsafe_allow_html=True)
             st.markdown('</div>', unsafe_allow_html=True)
@@ -723,8 +845,7 @@ elif st.session_state.nav.startswith("4"):
                 n = st.number_input("Advance N ticks", min_value=1, max_value=300, value=12, step=1)
                 if st.button("Advance"): exec_tick(n); st.rerun()
                 if st.button("Reset Execution"):
-                    for t in st.session_state.execution.values():
-                        t["status"]="Planned"; t["progress"]=0
+                    exec_engine().reset(); journal("reset_execution")
                     st.success("Execution state reset."); st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
 
@@ -765,10 +886,10 @@ elif st.session_state.nav.startswith("6"):
             top_filters()
             ags = filtered_agents()
             cols = st.columns(2)
-            for i, ag in enumerate(ags):
+            for i, ag in enumerate(paginate(ags, "dir_pg", 24)):
                 with cols[i % 2]:
                     # reuse card from Team page via small inline
-                    st.image(ag["avatar"], caption=f"{ag['name']} — {ag['title']}", use_container_width=True)
+                    st.image(agent_avatar(ag), caption=f"{ag['name']} — {ag['title']}", use_container_width=True)
                     if st.button("Chat", key=f"chat2_{ag['id']}"): jump_to_comms(ag["id"], "Chat")
 
         with tabs[1]:
@@ -788,15 +909,16 @@ elif st.session_state.nav.startswith("6"):
                 c1,c2,c3 = st.columns(3)
                 if c1.button("Send"):
                     if user_msg.strip():
-                        st.session_state.chats[sel].append({"role":"user","text":user_msg.strip(),"ts":str(datetime.now())})
                         reply = random.choice(["Acknowledged. Moving forward.","Coordinating with linked roles.","Pushing change and monitoring.","Starting now."])
-                        st.session_state.chats[sel].append({"role":"agent","text":reply,"ts":str(datetime.now())})
+                        for msg in [{"role":"user","text":user_msg.strip(),"ts":str(datetime.now())}, {"role":"agent","text":reply,"ts":str(datetime.now())}]:
+                            st.session_state.chats[sel].append(msg); journal("chat", agent=sel, msg=msg)
                         st.session_state.comms_target_agent = sel; st.rerun()
                 if c2.button("Clear Chat"):
-                    st.session_state.chats[sel] = [{"role":"agent","text":"Chat reset. How can I help?","ts":str(datetime.now())}]
+                    msg = {"role":"agent","text":"Chat reset. How can I help?","ts":str(datetime.now())}
+                    st.session_state.chats[sel] = [msg]; journal("chat_reset", agent=sel, msg=msg)
                     st.rerun()
                 if c3.button("🔄 Get Update (this agent)"):
-                    record_agent_update(sel); st.toast(f"Latest update pulled from {names[sel]}")
+                    record_agent_updates([sel]); st.toast(f"Latest update pulled from {names[sel]}")
                 upd = st.session_state.last_updates.get(sel)
                 if upd: st.caption(f"**Latest Update:** {upd}")
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -830,13 +952,13 @@ elif st.session_state.nav.startswith("6"):
                 st.subheader("Get Latest Updates from All Agents")
                 c = st.columns([1,1,2])
                 if c[0].button("Get All Updates 🔄"):
-                    for ag in st.session_state.agents: record_agent_update(ag["id"])
+                    record_agent_updates([ag["id"] for ag in st.session_state.agents])
                     st.success("Updates received.")
                 if c[1].button("Clear Updates"):
-                    st.session_state.last_updates = {}; st.rerun()
-                for ag in st.session_state.agents:
-                    upd = st.session_state.last_updates.get(ag["id"], "No update yet.")
-                    st.write(f"**{ag['name']} — {ag['title']}**: {upd}")
+                    st.session_state.last_updates = {}; journal("updates_clear"); st.rerun()
+                ups = st.session_state.last_updates
+                st.markdown("\n\n".join(f"**{ag['name']} — {ag['title']}**: {ups.get(ag['id'], 'No update yet.')}"
+                                         for ag in paginate(st.session_state.agents, "upd_pg", 48)))
                 st.markdown('</div>', unsafe_allow_html=True)
 
 # 7) Business OS (expanded; Finance now includes Payouts)
@@ -864,10 +986,10 @@ elif st.session_state.nav.startswith("7"):
             cost = col3.number_input("Unit Cost", 0.0, 999.0, 2.50, step=0.1)
             available = col1.checkbox("Available", value=True)
             if st.button("Add Item"):
-                st.session_state.menu_items.loc[len(st.session_state.menu_items)] = {
+                add_row("menu_items", {
                     "id": str(uuid.uuid4()), "name": name, "category": category, "price": float(price),
                     "sku": sku, "tags": tags, "img": "", "cost": float(cost), "available": bool(available)
-                }
+                })
                 st.success("Item added.")
         c1,c2,c3,c4 = st.columns(4)
         if c1.button("Run Schema Check"): st.info("✓ JSON-LD schema for MenuItem valid (demo).")
@@ -997,7 +1119,7 @@ elif st.session_state.nav.startswith("7"):
             ld = v3.number_input("Lead Days", 0, 30, 2)
             t = v4.text_input("Payment Terms", "Net 30")
             if st.button("Add Vendor"):
-                st.session_state.vendors.loc[len(st.session_state.vendors)] = {"id":str(uuid.uuid4()),"name":n,"contact":c,"lead_days":ld,"terms":t}
+                add_row("vendors", {"id":str(uuid.uuid4()),"name":n,"contact":c,"lead_days":ld,"terms":t})
                 st.success("Vendor added.")
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1014,9 +1136,9 @@ elif st.session_state.nav.startswith("7"):
             openh = l4.text_input("Open", "11:00")
             closeh = l1.text_input("Close", "22:00")
             if st.button("Add Location"):
-                st.session_state.locations.loc[len(st.session_state.locations)] = {
+                add_row("locations", {
                     "id":str(uuid.uuid4()),"name":nm,"tz":tz,"address":addr,"open":openh,"close":closeh
-                }
+                })
                 st.success("Location added.")
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1032,9 +1154,9 @@ elif st.session_state.nav.startswith("7"):
             loc = h3.text_input("Location")
             stt = h4.selectbox("Status", ["Active","Leave","Contract"], index=0)
             if st.button("Add Employee"):
-                st.session_state.employees.loc[len(st.session_state.employees)] = {
+                add_row("employees", {
                     "id":str(uuid.uuid4()),"name":nm,"role":rl,"location":loc,"status":stt
-                }
+                })
                 st.success("Employee added.")
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1078,9 +1200,9 @@ elif st.session_state.nav.startswith("7"):
             area = e2.selectbox("Area", ["Reservations","Ordering","Delivery","Menu","Pricing","Email/Lifecycle"], index=2)
             metric = e3.text_input("Primary Metric", "Checkout CR")
             if st.button("Add Experiment"):
-                st.session_state.experiments.loc[len(st.session_state.experiments)] = {
+                add_row("experiments", {
                     "id":str(uuid.uuid4()),"name":name,"area":area,"status":"Proposed","metric":metric,"uplift_pct":0.0
-                }
+                })
                 st.success("Experiment proposed.")
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1094,7 +1216,7 @@ elif st.session_state.nav.startswith("7"):
             nm = d1.text_input("Name")
             tp = d2.text_input("Type")
             if st.button("Connect"):
-                st.session_state.connectors.loc[len(st.session_state.connectors)] = {"id":str(uuid.uuid4()),"name":nm,"type":tp,"status":"Connecting"}
+                add_row("connectors", {"id":str(uuid.uuid4()),"name":nm,"type":tp,"status":"Connecting"})
                 create_alert("info", f"Connecting to {nm}…")
                 st.success("Connector initiated (demo).")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -1103,15 +1225,18 @@ elif st.session_state.nav.startswith("7"):
     with bos_tab[15]:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Settings & Export")
-        st.write("Save/Load full OperAI state as a JSON bundle.")
+        st.write("Save/Load full OperAI state as a zip snapshot (older .json exports still load).")
         c1, c2 = st.columns(2)
-        if c1.button("Export State (.json)"):
-            data = serialize_state()
-            st.download_button("Download operai_state.json", data=json.dumps(data, indent=2),
-                               file_name="operai_state.json", mime="application/json")
-        uploaded = c2.file_uploader("Import State (.json)", type=["json"])
+        if c1.button("Export State (.zip)"):
+            st.download_button("Download operai_state.zip", data=serialize_state(),
+                               file_name="operai_state.zip", mime="application/zip")
+        uploaded = c2.file_uploader("Import State (.zip)", type=["zip","json"])
+        if STATE_DIR:
+            j = session_journal()
+            st.caption(f"Persisting to {j.root}: generation {j.generation}, {j.pending} changes since the last checkpoint.")
+            if st.button("Checkpoint now"): checkpoint_state(); st.rerun()
         if uploaded and st.button("Load"):
-            load_state(json.loads(uploaded.read()))
+            load_state(uploaded.getvalue()); checkpoint_state()
             st.success("State loaded."); st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1128,23 +1253,28 @@ elif st.session_state.nav.startswith("8"):
 elif st.session_state.nav.startswith("9"):
     st.subheader("Role Marketplace — Add AI Employees")
     cats = sorted({v["cat"] for v in ROLE_LIBRARY.values()})
+    role_q = st.text_input("Search roles, skills or tools", key="role_q")
     col1,col2 = st.columns([1,3])
     pick_cat = col1.selectbox("Category", ["All"]+cats)
     def role_label(k): r=ROLE_LIBRARY[k]; return f"{r['title']}  ·  {r['cat']}"
-    role_keys = list(ROLE_LIBRARY.keys())
+    ridx = role_index()
+    role_keys = [ridx.keys[i] for i in ridx.search(role_q)] if role_q.strip() else list(ROLE_LIBRARY.keys())
     if pick_cat != "All": role_keys = [k for k in role_keys if ROLE_LIBRARY[k]["cat"]==pick_cat]
-    sel_role = col2.selectbox("Pick a role", role_keys, format_func=lambda k: role_label(k))
-    st.markdown('<div class="card">', unsafe_allow_html=True)
-    r = ROLE_LIBRARY[sel_role]
-    st.write(f"**{r['title']}** — _{r['cat']}_")
-    st.write(r["about"])
-    st.write("**Top skills:** " + ", ".join(r["skills"]))
-    if st.button("Hire this AI Agent"):
-        new_ag = make_agent(sel_role)
-        st.session_state.agents.append(new_ag)
-        create_alert("info", f"Hired AI Agent: {new_ag['title']} ({new_ag['name']})")
-        st.success(f"Added {new_ag['title']} — {new_ag['name']}")
-    st.markdown('</div>', unsafe_allow_html=True)
+    if not role_keys: st.info("No roles match your search.")
+    else:
+        sel_role = col2.selectbox("Pick a role", role_keys, format_func=lambda k: role_label(k))
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        r = ROLE_LIBRARY[sel_role]
+        st.write(f"**{r['title']}** — _{r['cat']}_")
+        st.write(r["about"])
+        st.write("**Top skills:** " + ", ".join(r["skills"]))
+        if st.button("Hire this AI Agent"):
+            new_ag = make_agent(sel_role)
+            st.session_state.agents.append(new_ag)
+            journal("agent", agent=new_ag, chat=st.session_state.chats[new_ag["id"]])
+            create_alert("info", f"Hired AI Agent: {new_ag['title']} ({new_ag['name']})")
+            st.success(f"Added {new_ag['title']} — {new_ag['name']}")
+        st.markdown('</div>', unsafe_allow_html=True)
 
 # 10) Scenario Planner — simulate price/promo/hours and view KPI deltas
 elif st.session_state.nav.startswith("10"):
@@ -0,0 +1,129 @@
+# timeline.py
+# Timeline scheduler for the Demo's task DAG (no Streamlit import).
+#   1. critical path: forward / backward pass over a topological order → ES, EF, LS, LF, slack
+#   2. resource levelling: tasks are placed in (ES, LS) priority order, each starting when its
+#      dependencies have finished *and* its agent has a free slot (`capacity` tasks at a time)
+#   3. float on the levelled schedule: a backward pass in which a task must also end before the
+#      next task in its agent slot starts, so `slack` / `critical` describe the dates shown
+#   4. the Gantt frame is built from the resulting arrays in one pass
+# Durations are in days.
+#   python timeline.py --tasks 100000
+
+import argparse, heapq, time
+from datetime import date
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from workflows import topo_order
+
+def _csr(keys, vals, n):
+    order = np.argsort(keys, kind="stable")
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=n))))
+    return indptr.tolist(), vals[order].tolist()
+
+def schedule(durations, src, dst, owners, capacity=1):
+    """CPM + levelled schedule. `owners` holds an agent code per task (-1 = unconstrained).
+    es / ef / ls / lf / cpm_slack ignore agents; start / finish / slack / critical are levelled."""
+    dur = np.asarray(durations, dtype=np.int64); N = len(dur)
+    src = np.asarray(src, dtype=np.intp); dst = np.asarray(dst, dtype=np.intp)
+    order = topo_order(N, src, dst).tolist()
+    pptr, preds = _csr(dst, src, N)
+    sptr, succs = _csr(src, dst, N)
+    d = dur.tolist()
+    es = [0]*N; ef = [0]*N
+    for v in order:
+        s = 0
+        for k in range(pptr[v], pptr[v + 1]):
+            f = ef[preds[k]]
+            if f > s: s = f
+        es[v] = s; ef[v] = s + d[v]
+    end = max(ef) if N else 0
+    ls = [0]*N; lf = [end]*N
+    for v in reversed(order):
+        m = end
+        for k in range(sptr[v], sptr[v + 1]):
+            x = ls[succs[k]]
+            if x < m: m = x
+        lf[v] = m; ls[v] = m - d[v]
+    es_a, ls_a = np.array(es), np.array(ls)
+    # serial schedule generation: ES order is topological (durations > 0), LS breaks ties toward critical work
+    prio = np.lexsort((ls_a, es_a)).tolist()
+    own = np.asarray(owners, dtype=np.int64).tolist()
+    slots = {}; last = {}
+    start = [0]*N; finish = [0]*N
+    nxt = [-1]*N                        # next task in the same agent slot
+    for v in prio:
+        s = 0
+        for k in range(pptr[v], pptr[v + 1]):
+            f = finish[preds[k]]
+            if f > s: s = f
+        o = own[v]
+        if o >= 0:
+            heap = slots.get(o)
+            if heap is None: heap = slots[o] = [(0, k) for k in range(capacity)]
+            free, k = heap[0]
+            if free > s: s = free
+            heapq.heapreplace(heap, (s + d[v], k))
+            p = last.get((o, k))
+            if p is not None: nxt[p] = v
+            last[(o, k)] = v
+        start[v] = s; finish[v] = s + d[v]
+    # backward pass over the levelled schedule (prio is topological for both kinds of edge)
+    span = max(finish) if N else 0
+    late = [0]*N
+    for v in reversed(prio):
+        m = span
+        for k in range(sptr[v], sptr[v + 1]):
+            x = late[succs[k]]
+            if x < m: m = x
+        n = nxt[v]
+        if n >= 0 and late[n] < m: m = late[n]
+        late[v] = m - d[v]
+    start_a = np.array(start)
+    slack = np.array(late) - start_a
+    return {"es": es_a, "ef": np.array(ef), "ls": ls_a, "lf": np.array(lf), "cpm_slack": ls_a - es_a,
+            "slack": slack, "critical": slack == 0,
+            "start": start_a, "finish": np.array(finish), "order": np.array(order, dtype=np.intp)}
+
+def timeline_frame(tasks: Dict[str, Dict], agents: List[Dict], rng=None, start_date=None, capacity=1) -> pd.DataFrame:
+    """Gantt rows (Agent, Role, Task, Start, End, Week, Critical, Slack) for the execution dict."""
+    rng = rng if rng is not None else np.random.default_rng()
+    ids = list(tasks); index = {tid: i for i, tid in enumerate(ids)}; N = len(ids)
+    src, dst = [], []
+    for i, t in enumerate(tasks.values()):
+        for dep in t["depends_on"]:
+            j = index.get(dep)
+            if j is not None: src.append(j); dst.append(i)
+    agent_code = {a["id"]: k for k, a in enumerate(agents)}
+    owners = np.fromiter((agent_code.get(t["owner"], -1) for t in tasks.values()), dtype=np.int64, count=N)
+    durations = rng.integers(2, 5, N)
+    sch = schedule(durations, np.array(src, dtype=np.intp), np.array(dst, dtype=np.intp), owners, capacity)
+    names = np.array([a["name"] for a in agents] + ["Agent"], dtype=object)
+    titles = np.array([a["title"] for a in agents] + ["Role"], dtype=object)
+    day0 = np.datetime64(start_date or date.today(), "D")
+    df = pd.DataFrame({
+        "Agent": names[owners], "Role": titles[owners],
+        "Task": [t["title"] for t in tasks.values()],
+        "Start": pd.to_datetime(day0 + sch["start"]), "End": pd.to_datetime(day0 + sch["finish"]),
+        "Week": sch["start"]//7 + 1, "Critical": sch["critical"], "Slack": sch["slack"],
+    })
+    return df.sort_values(["Start","Agent","Task"]).reset_index(drop=True)
+
+def main(argv=None):
+    from execution import random_dag
+    p = argparse.ArgumentParser(description="Schedule a large random task DAG.")
+    p.add_argument("--tasks", type=int, default=100_000)
+    p.add_argument("--agents", type=int, default=500)
+    p.add_argument("--capacity", type=int, default=1)
+    args = p.parse_args(argv)
+    src, dst = random_dag(args.tasks)
+    rng = np.random.default_rng(0)
+    t0 = time.perf_counter()
+    sch = schedule(rng.integers(2, 5, args.tasks), src, dst, rng.integers(0, args.agents, args.tasks), args.capacity)
+    dt = time.perf_counter() - t0
+    print(f"{args.tasks} tasks, {len(src)} deps in {1e3*dt:.0f} ms: critical path {int(sch['ef'].max())} days "
+          f"({int((sch['cpm_slack'] == 0).sum())} critical tasks), levelled makespan {int(sch['finish'].max())} days "
+          f"({int(sch['critical'].sum())} critical tasks)")
+
+if __name__ == "__main__":
+    main()
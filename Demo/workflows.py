@@ -0,0 +1,161 @@
+# workflows.py
+# Planner → workflow compiler for the Demo (no Streamlit import).
+# Templates are compiled once into local index form (titles, owner role keys, edge arrays) and
+# cached; a compile then only offsets those arrays, resolves owners through role_key / category
+# indexes and checks the assembled graph for cycles. Dependency names resolve inside their own
+# template first, then across the other templates in the same compile; titles shared between
+# templates are reported as collisions instead of silently rebinding each other's edges.
+#   python workflows.py --bulk 5000          # bulk-compile benchmark
+
+import argparse, time
+from typing import Dict, List, Optional
+import numpy as np
+
+class WorkflowError(ValueError):
+    pass
+
+class CompiledTemplate:
+    def __init__(self, key: str, tpl: Dict):
+        self.key = key; self.tpl = tpl       # holding tpl keeps its id() stable as a cache key
+        self.name = tpl["name"]
+        items = tpl["tasks"]
+        self.titles = [it["title"] for it in items]
+        self.owners = [it["owner"] for it in items]
+        self.local = {}
+        for i, title in enumerate(self.titles):
+            if title in self.local:
+                raise WorkflowError(f"Template {key!r}: duplicate task title {title!r}")
+            self.local[title] = i
+        src, dst, self.external = [], [], []     # external: (task index, dependency name) outside this template
+        for i, it in enumerate(items):
+            for name in it["depends_on"]:
+                j = self.local.get(name)
+                if j is None: self.external.append((i, name))
+                else: src.append(j); dst.append(i)
+        self.src = np.array(src, dtype=np.intp); self.dst = np.array(dst, dtype=np.intp)
+
+_TEMPLATE_CACHE: Dict[tuple, CompiledTemplate] = {}
+
+def compiled_template(key: str, tpl: Dict) -> CompiledTemplate:
+    ck = (key, id(tpl))
+    ct = _TEMPLATE_CACHE.get(ck)
+    if ct is None: ct = _TEMPLATE_CACHE[ck] = CompiledTemplate(key, tpl)
+    return ct
+
+class AgentIndex:
+    """First agent per role_key and per category (the order `next(...)` used to find them)."""
+
+    def __init__(self, agents: List[Dict], role_cats: Dict[str, str]):
+        self.by_role, self.by_cat = {}, {}
+        for a in agents:
+            self.by_role.setdefault(a["role_key"], a["id"])
+            self.by_cat.setdefault(a["cat"], a["id"])
+        self.default = agents[0]["id"] if agents else None
+        self.role_cats = role_cats
+        self.n = len(agents)
+
+    def owner(self, role_key: str) -> Optional[str]:
+        oid = self.by_role.get(role_key)
+        if oid is None: oid = self.by_cat.get(self.role_cats.get(role_key), self.default)
+        return oid
+
+class WorkflowDAG:
+    """Compact compiled workflow: parallel task arrays plus an edge list (src → dst, dst depends on src)."""
+
+    def __init__(self, name, ids, titles, owners, src, dst, collisions=(), unresolved=()):
+        self.name = name
+        self.ids = ids; self.titles = titles; self.owners = owners
+        self.src = src; self.dst = dst
+        self.collisions = list(collisions)      # titles defined by more than one template
+        self.unresolved = list(unresolved)      # (task id, dependency name) that matched nothing
+        self.order = topo_order(len(ids), src, dst)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def depends_on(self):
+        deps = [[] for _ in self.ids]
+        for s, d in zip(self.src.tolist(), self.dst.tolist()): deps[d].append(self.ids[s])
+        return deps
+
+    def to_execution(self) -> Dict[str, Dict]:
+        return {tid: {"id": tid, "title": title, "owner": owner, "status": "Planned", "progress": 0, "depends_on": deps}
+                for tid, title, owner, deps in zip(self.ids, self.titles, self.owners, self.depends_on())}
+
+def topo_order(n, src, dst):
+    """Kahn's algorithm over edge arrays; raises WorkflowError if the graph has a cycle."""
+    indeg = np.bincount(dst, minlength=n)
+    order_src = np.argsort(src, kind="stable")
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n))))
+    children = dst[order_src]
+    frontier = list(np.flatnonzero(indeg == 0))
+    out = []
+    while frontier:
+        v = frontier.pop()
+        out.append(v)
+        for c in children[indptr[v]:indptr[v + 1]]:
+            indeg[c] -= 1
+            if indeg[c] == 0: frontier.append(c)
+    if len(out) != n:
+        raise WorkflowError(f"Dependency cycle among {n - len(out)} tasks")
+    return np.array(out, dtype=np.intp)
+
+def compile_templates(keys: List[str], templates: Dict[str, Dict], agents: AgentIndex, first_index: int = 1) -> WorkflowDAG:
+    """Instantiate `keys` as one workflow; task ids continue from T{first_index:04}."""
+    cts = [compiled_template(k, templates[k]) for k in keys]
+    ids, titles, owners, srcs, dsts = [], [], [], [], []
+    by_title, collisions = {}, []
+    base = 0
+    for ct in cts:
+        for t in ct.titles:
+            if t in by_title: collisions.append(t)
+            else: by_title[t] = base + ct.local[t]
+        ids.extend(f"T{first_index + base + i:04}" for i in range(len(ct.titles)))
+        titles.extend(ct.titles)
+        owners.extend(agents.owner(r) for r in ct.owners)
+        srcs.append(ct.src + base); dsts.append(ct.dst + base)
+        base += len(ct.titles)
+    unresolved = []
+    base = 0
+    for ct in cts:
+        for i, name in ct.external:
+            j = by_title.get(name)
+            if j is None: unresolved.append((ids[base + i], name))
+            else: srcs.append(np.array([j])); dsts.append(np.array([base + i]))
+        base += len(ct.titles)
+    src = np.concatenate(srcs).astype(np.intp) if srcs else np.empty(0, dtype=np.intp)
+    dst = np.concatenate(dsts).astype(np.intp) if dsts else np.empty(0, dtype=np.intp)
+    return WorkflowDAG(" + ".join(ct.name for ct in cts), ids, titles, owners, src, dst, collisions, unresolved)
+
+# ---------- Bulk benchmark ----------
+def synthetic_templates(n, tasks=6, seed=0):
+    rng = np.random.default_rng(seed)
+    out = {}
+    for k in range(n):
+        items = []
+        for i in range(tasks):
+            deps = sorted({f"t{k}.{j}" for j in rng.integers(0, i, min(i, 2))}) if i else []
+            items.append({"title": f"t{k}.{i}", "owner": f"role{rng.integers(0, 30)}", "depends_on": deps})
+        out[f"tpl{k}"] = {"name": f"Template {k}", "tasks": items}
+    return out
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Bulk-compile synthetic workflow templates.")
+    p.add_argument("--bulk", type=int, default=5000, help="workflows to compile")
+    p.add_argument("--per-workflow", type=int, default=5, help="templates per workflow")
+    args = p.parse_args(argv)
+    templates = synthetic_templates(200)
+    agents = AgentIndex([{"id": f"a{i}", "role_key": f"role{i}", "cat": f"cat{i % 5}"} for i in range(25)],
+                        {f"role{i}": f"cat{i % 5}" for i in range(30)})
+    keys = list(templates)
+    rng = np.random.default_rng(0)
+    t0 = time.perf_counter(); next_id = 1
+    for _ in range(args.bulk):
+        dag = compile_templates([keys[i] for i in rng.choice(len(keys), args.per_workflow, replace=False)], templates, agents, next_id)
+        next_id += len(dag)
+    dt = time.perf_counter() - t0
+    print(f"{args.bulk} workflows ({args.bulk*args.per_workflow} templates, {next_id-1} tasks) in {dt:.3f}s "
+          f"→ {args.bulk*args.per_workflow/dt:,.0f} templates/s")
+
+if __name__ == "__main__":
+    main()
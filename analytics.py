@@ -0,0 +1,121 @@
+# analytics.py
+# KPI analytics helpers for the Analytics tab (pandas, no Streamlit import).
+#
+# KPIRollup keeps per-day and per-channel×day sums of campaign_kpis.csv, folding in only rows
+# appended since the last update; reruns with an unchanged file (same size/mtime) skip all work.
+
+import os
+import numpy as np
+import pandas as pd
+from autonomy import OUTPUT_DIR
+from kpis import open_store
+
+SUM_COLS = ["impressions","clicks","orders","spend"]
+RESOLUTIONS = {"day": 1, "week": 7, "month": 30}     # KPI days are integer indices, so a "month" is 30 days
+
+# ---------- Analytics Helpers ----------
+def kpis_csv_path(output_dir=OUTPUT_DIR):
+    path = os.path.join(output_dir, "campaign_kpis.csv")
+    if not os.path.exists(path):
+        df = pd.DataFrame([
+            {"day":1,"channel":"Google","impressions":3000,"clicks":60,"orders":6,"spend":120.0},
+            {"day":1,"channel":"Instagram","impressions":3000,"clicks":60,"orders":6,"spend":120.0},
+            {"day":1,"channel":"LinkedIn","impressions":3000,"clicks":60,"orders":6,"spend":120.0},
+        ])
+        df.to_csv(path, index=False)
+    return path
+
+def load_kpis_df(output_dir=OUTPUT_DIR):
+    store = open_store(kpis_csv_path(output_dir))
+    store.refresh()
+    return store.frame()
+
+def compute_metrics(df):
+    df = df.copy()
+    df["CTR"] = df["clicks"] / df["impressions"].clip(lower=1)
+    df["CAC"] = df["spend"] / df["orders"].clip(lower=1)
+    return df
+
+def channel_options(df):
+    chs = ["All"] + sorted(df["channel"].unique().tolist())
+    return chs
+
+# ---------- Incremental rollups ----------
+class KPIRollup:
+    """Per-day and per-channel×day KPI sums over a KPIStore, maintained incrementally.
+
+    `update()` is keyed on the CSV's (size, mtime): unchanged files cost one stat. Appended rows are
+    grouped and folded into the existing sums; a rebuilt store (truncated or rewritten CSV) starts over.
+    `view(channel, resolution)` returns the dashboard frame for one channel or "All" at day / week /
+    month granularity (sums re-bucketed, then CTR/CAC recomputed), memoized until the next change.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._stat = None; self._gen = None
+        self.reset()
+
+    def reset(self):
+        self.seen = 0
+        idx = pd.MultiIndex.from_arrays([np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)], names=["channel","day"])
+        self.by_channel_day = pd.DataFrame({c: np.empty(0, dtype=float if c == "spend" else np.int64) for c in SUM_COLS}, index=idx)
+        self.by_day = self.by_channel_day.groupby(level="day").sum()
+        self._views = {}
+
+    def update(self):
+        """Fold in rows appended since the last call; returns True when the rollups changed."""
+        try:
+            st = os.stat(self.store.csv_path)
+        except FileNotFoundError:
+            return False
+        key = (st.st_size, st.st_mtime_ns)
+        if key == self._stat: return False
+        self._stat = key
+        self.store.refresh()
+        with self.store.lock:
+            if self.store.generation != self._gen:
+                self._gen = self.store.generation
+                self.reset()
+            n = self.store.rows
+            if n == self.seen: return False
+            cols = self.store.columns()
+            new = pd.DataFrame({"channel": np.array(cols["channel"][self.seen:n]), "day": np.array(cols["day"][self.seen:n]),
+                                **{c: np.array(cols[c][self.seen:n]) for c in SUM_COLS}})
+            self.seen = n
+        new = new.groupby(["channel","day"]).sum()
+        self.by_channel_day = _fold(self.by_channel_day, new)
+        self.by_day = _fold(self.by_day, new.groupby(level="day").sum())
+        self._views = {}
+        return True
+
+    @property
+    def channels(self):
+        return list(self.store.channels)
+
+    def channel_options(self):
+        return ["All"] + sorted(self.channels)
+
+    def view(self, channel="All", resolution="day"):
+        v = self._views.get((channel, resolution))
+        if v is None:
+            if channel == "All":
+                v = self.by_day
+            else:
+                code = self.channels.index(channel) if channel in self.channels else -1
+                v = (self.by_channel_day.xs(code, level="channel") if code in self.by_channel_day.index.levels[0]
+                     else self.by_day.iloc[:0])
+            step = RESOLUTIONS[resolution]
+            if step > 1:
+                v = v.groupby((v.index - 1)//step + 1).sum().rename_axis(resolution)
+            v = v.reset_index()
+            if channel != "All": v.insert(1, "channel", channel)
+            v = self._views[(channel, resolution)] = compute_metrics(v)
+        return v
+
+def _fold(acc, new):
+    """acc + new, aligned on the index; append-only days usually just concatenate."""
+    if acc.empty: return new
+    if not new.index.isin(acc.index).any():
+        out = pd.concat([acc, new])
+        return out if out.index.is_monotonic_increasing else out.sort_index()
+    return pd.concat([acc, new]).groupby(level=list(range(acc.index.nlevels))).sum()
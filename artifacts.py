@@ -0,0 +1,271 @@
+# artifacts.py
+# Artifact I/O for OUTPUT_DIR: atomic writes, an optional write-behind queue, and a cached head read.
+#
+# ArtifactStore(window=0) writes through immediately. With window > 0, `write` / `append` only
+# queue the content and return; a background thread flushes the queue `window` seconds after the
+# first pending write, so a file rewritten many times within one window hits the disk once (last
+# write wins, appends are concatenated). Entries leave the queue only once they are on disk, so
+# reads never observe a stale file. After close(), and for an append onto a queued binary write,
+# content goes straight to disk behind anything still queued. `read_head` loads only the first
+# N bytes and caches them by (mtime, size).
+# ArtifactIndex keeps name / size / mtime / hash / preview for everything under a directory,
+# refreshed by polling with one stat per file.
+
+import os, time, codecs, atexit, asyncio, hashlib, tempfile, threading, weakref
+
+def _read_umask():
+    # Linux reports it without changing it; elsewhere toggle once, at import, before any writer thread runs
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"): return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0o022); os.umask(umask)
+    return umask
+
+NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+def _file_mode(path):
+    # mkstemp creates 0600 files; keep the mode a plain open() would have given (or already had).
+    # Artifacts an older version already wrote as 0600 therefore stay 0600 until chmod-ed by hand.
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return NEW_FILE_MODE
+
+def atomic_write(path, content, mode="w"):
+    d = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **({"newline": ""} if "b" not in mode else {})) as f:
+            f.write(content)
+        os.chmod(tmp, _file_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+def _decode_head(data):
+    # drop a multi-byte character cut in half by the byte limit instead of rendering U+FFFD
+    return codecs.getincrementaldecoder("utf-8")(errors="replace").decode(data, final=False)
+
+_LIVE = weakref.WeakSet()
+atexit.register(lambda: [s.flush() for s in list(_LIVE)])
+
+class ArtifactStore:
+    def __init__(self, window=0.0, head_bytes=500):
+        self.window = window
+        self.head_bytes = head_bytes
+        self._pending = {}          # path → (mode, content); mode "w" / "wb" replace, "a" appends
+        self._cv = threading.Condition()
+        self._io = threading.RLock()    # one flusher at a time keeps per-path write order
+        self._heads = {}            # path → ((mtime_ns, size, n), text)
+        self._thread = None; self._closed = False
+        self._since = 0.0           # monotonic time the queue last went from empty to non-empty
+        self.writes = 0; self.coalesced = 0; self.head_hits = 0
+        _LIVE.add(self)
+
+    # ---------- writes ----------
+    def write(self, path, content, mode="w"):
+        with self._cv:
+            if self.window and not self._closed:
+                if path in self._pending: self.coalesced += 1
+                else: self._kick()
+                self._pending[path] = (mode, content)
+                return
+        with self._io:
+            self.flush(); atomic_write(path, content, mode); self.writes += 1
+
+    def append(self, path, text):
+        with self._cv:
+            prev = self._pending.get(path)
+            if self.window and not self._closed and (prev is None or prev[0] != "wb"):
+                if prev is None:
+                    self._kick(); self._pending[path] = ("a", text)
+                else:
+                    self.coalesced += 1
+                    self._pending[path] = (prev[0], prev[1] + text)
+                return
+        with self._io:
+            self.flush()
+            with open(path, "a") as f: f.write(text)
+            self.writes += 1
+
+    def _kick(self):
+        # a new path is about to be queued (cv held); only the first one opens a window
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+            self._thread.start()
+        if not self._pending:
+            self._since = time.monotonic(); self._cv.notify()
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._pending and not self._closed: self._cv.wait()
+                if self._closed and not self._pending: return
+                while not self._closed:             # let writes in this window coalesce
+                    left = self._since + self.window - time.monotonic()
+                    if left <= 0: break
+                    self._cv.wait(left)
+            self.flush()
+
+    def flush(self):
+        """Write everything queued so far; returns the number of files written."""
+        with self._io:
+            with self._cv: paths = list(self._pending)
+            written = 0
+            for path in paths:
+                with self._cv:
+                    entry = self._pending.get(path)
+                    if entry is None: continue
+                    if entry[0] == "a":
+                        # appends are small: write them under the lock so read_head never sees the text twice
+                        with open(path, "a") as f: f.write(entry[1])
+                        del self._pending[path]; written += 1
+                        continue
+                atomic_write(path, entry[1], entry[0]); written += 1
+                with self._cv:
+                    if self._pending.get(path) is entry: del self._pending[path]   # else rewritten meanwhile
+            with self._cv:
+                if self._pending: self._since = time.monotonic()   # rewritten meanwhile: a new window
+            self.writes += written
+            return written
+
+    def close(self):
+        with self._cv:
+            self._closed = True; self._cv.notify()
+        if self._thread is not None: self._thread.join()
+        self.flush()
+
+    # ---------- reads ----------
+    def exists(self, path):
+        return path in self._pending or os.path.exists(path)
+
+    def read_head(self, path, n=None):
+        """First `n` bytes (default `head_bytes`) of a file as text, or None if it doesn't exist."""
+        n = n or self.head_bytes
+        with self._cv:
+            pending = self._pending.get(path)
+            if pending is not None and pending[0] == "a":
+                # under the lock the queued text can't land in the file between the two reads
+                text = self._file_head(path, n)
+                return ((text or "") + pending[1])[:n]
+        if pending is not None:
+            content = pending[1]
+            return _decode_head(content[:n]) if isinstance(content, bytes) else content[:n]
+        return self._file_head(path, n)
+
+    def _file_head(self, path, n):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_mtime_ns, st.st_size, n)
+        hit = self._heads.get(path)
+        if hit is not None and hit[0] == key:
+            self.head_hits += 1; text = hit[1]
+        else:
+            with open(path, "rb") as f: text = _decode_head(f.read(n))
+            self._heads[path] = (key, text)
+        return text
+
+    def invalidate(self, path=None):
+        if path is None: self._heads.clear()
+        else: self._heads.pop(path, None)
+
+    # ---------- asyncio ----------
+    async def aread_head(self, path, n=None):
+        return await asyncio.to_thread(self.read_head, path, n)
+
+    async def aflush(self):
+        return await asyncio.to_thread(self.flush)
+
+# ---------- Index ----------
+class ArtifactIndex:
+    """name → {name, size, mtime, hash, preview} for every artifact under `root`.
+
+    `refresh()` walks the tree with os.scandir (one stat per entry) and only re-reads files whose
+    (size, mtime) changed; hidden names (temp files, .kpi_cache) are skipped. Files up to
+    `hash_max_bytes` get a blake2b content hash, larger ones `None`. `watch(interval)` polls in a
+    daemon thread; readers take `entries()` without touching the disk.
+    """
+
+    def __init__(self, root, preview_bytes=500, hash_max_bytes=16 << 20):
+        self.root = root
+        self.preview_bytes = preview_bytes
+        self.hash_max_bytes = hash_max_bytes
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event(); self._thread = None
+        self.version = 0            # bumped whenever an entry is added, changed or removed
+
+    def _scan(self, d, out):
+        try:
+            it = os.scandir(d)
+        except FileNotFoundError:
+            return
+        with it:
+            for e in it:
+                if e.name.startswith("."): continue
+                if e.is_dir(follow_symlinks=False): self._scan(e.path, out)
+                elif e.is_file():
+                    st = e.stat()
+                    out[os.path.relpath(e.path, self.root)] = (e.path, st.st_size, st.st_mtime_ns)
+
+    def _load(self, name, path, size, mtime_ns):
+        h = hashlib.blake2b(digest_size=16) if size <= self.hash_max_bytes else None
+        with open(path, "rb") as f:
+            head = f.read(max(self.preview_bytes, 1 << 16) if h else self.preview_bytes)
+            if h:
+                h.update(head)
+                for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+        return {"name": name, "size": size, "mtime": mtime_ns/1e9, "_mtime_ns": mtime_ns,
+                "hash": h.hexdigest() if h else None, "preview": _decode_head(head[:self.preview_bytes])}
+
+    def refresh(self):
+        """Re-stat the tree; returns (added, changed, removed) name lists."""
+        seen = {}
+        self._scan(self.root, seen)
+        added, changed, loaded = [], [], {}
+        for name, (path, size, mtime_ns) in seen.items():
+            old = self._entries.get(name)
+            if old is not None and old["size"] == size and old["_mtime_ns"] == mtime_ns: continue
+            try:
+                loaded[name] = self._load(name, path, size, mtime_ns)
+            except FileNotFoundError:
+                continue
+            (changed if old is not None else added).append(name)
+        removed = [n for n in self._entries if n not in seen]
+        if added or changed or removed:
+            with self._lock:
+                entries = dict(self._entries)
+                for n in removed: entries.pop(n, None)
+                entries.update(loaded)
+                self._entries = entries
+                self.version += 1
+        return added, changed, removed
+
+    def entries(self):
+        """Snapshot of the index sorted by name (no disk access)."""
+        entries = self._entries
+        return [entries[n] for n in sorted(entries)]
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def watch(self, interval=2.0):
+        if self._thread is None:
+            self.refresh()
+            def loop():
+                while not self._stop.wait(interval): self.refresh()
+            self._thread = threading.Thread(target=loop, name="artifact-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join()
+        self._thread = None; self._stop.clear()
@@ -0,0 +1,241 @@
+# autonomy.py
+# Headless Sense → Think → Act → Learn engine for the AI Virtual Café demo.
+# Importable without Streamlit; the dashboard embeds AutonomyEngine and the CLI drives it directly:
+#   python autonomy.py --ticks 10000 --seed 7
+
+import os, csv, math, random, time, json, argparse
+import numpy as np
+from kpis import RollingKPIs, parse_kpi_row, open_store
+from bandit import ArrayBandit, kpi_reward
+from budget import BudgetWriter
+from creatives import CreativeRegistry
+from signals import RandomWalkSource, ReplaySource, HTTPSource
+from rules import RuleSet, RuleEvaluator
+
+OUTPUT_DIR = '/mnt/data/ai_virtual_factory'
+CHANNELS = ["Google","Instagram","LinkedIn"]
+COMPANY = "AI Virtual Café"
+
+# ---------- Helpers ----------
+def write_markdown(fname, content, output_dir=OUTPUT_DIR, store=None):
+    if store is not None:
+        store.write(os.path.join(output_dir, fname), content); return
+    with open(os.path.join(output_dir, fname), 'w') as f:
+        f.write(content)
+
+def read_kpis(path):
+    kpis = []
+    if os.path.exists(path):
+        with open(path) as f:
+            r = csv.DictReader(f)
+            for row in r:
+                kpis.append(parse_kpi_row(row))
+    return kpis
+
+# ---------- Autonomy Helpers (Sense → Think → Act) ----------
+def score_channels(agg, cac_penalty=0.0005):
+    scores = {}
+    for ch, m in agg.items():
+        ctr = (m["clicks"] / max(1, 3000))
+        cac = (m["spend"] / max(1, m["leads"])) if m["leads"] else 999
+        score = ctr - cac_penalty * cac
+        scores[ch] = score
+    return scores
+
+def softmax_weights(scores, channels, sharpness=3.0):
+    # sharpness is an inverse temperature: higher concentrates spend on the best-scoring channel
+    exps = {ch: math.exp(sharpness*scores.get(ch,0)) for ch in channels}
+    total = sum(exps.values()) or 1.0
+    return {ch: exps[ch]/total for ch in channels}
+
+def think_plan(state, kpi_rows, channels, rng=random, agg=None):
+    if agg is None:
+        agg = RollingKPIs(len(channels)*3).extend(kpi_rows[-len(channels)*3:]).totals(channels)
+    scores = score_channels(agg)
+    bandit = state.setdefault("bandit", {})
+    epsilon = state.setdefault("epsilon", 0.2)
+    chosen = {}
+    for ch in channels:
+        b = bandit.setdefault(ch, {"A":{"reward":0.0,"n":0},"B":{"reward":0.0,"n":0}})
+        if rng.random() < epsilon:
+            variant = rng.choice(["A","B"])
+        else:
+            avgA = b["A"]["reward"]/max(1,b["A"]["n"])
+            avgB = b["B"]["reward"]/max(1,b["B"]["n"])
+            variant = "A" if avgA >= avgB else "B"
+        chosen[ch] = variant
+    plan = {"weights": softmax_weights(scores, channels), "creative": chosen, "scores": scores}
+    state["last_plan"] = plan
+    return plan
+
+def act_apply(plan, budget_total, channels, output_dir=OUTPUT_DIR, writer=None):
+    # a long-lived BudgetWriter skips ticks whose allocation did not change
+    writer = writer or BudgetWriter(output_dir)
+    return writer.write(plan, budget_total, channels)
+
+def learn_update(state, plan, kpi_rows):
+    if not kpi_rows: return state
+    last = kpi_rows[-1]
+    ch = last["channel"]
+    impressions = float(last.get("impressions", 3000))
+    clicks = float(last.get("clicks", 60))
+    orders = float(last.get("orders", 6))
+    spend = float(last.get("spend", 120.0))
+    ctr = clicks / max(1.0, impressions)
+    cpa = spend / max(1.0, orders)
+    reward = ctr - 0.0005*cpa
+    chosen = plan["creative"].get(ch, "A")
+    b = state.setdefault("bandit", {}).setdefault(ch, {"A":{"reward":0.0,"n":0},"B":{"reward":0.0,"n":0}})
+    b[chosen]["reward"] += reward
+    if "reward_sq" in b[chosen]: b[chosen]["reward_sq"] += reward*reward
+    b[chosen]["n"] += 1
+    return state
+
+_DEFAULT_RULESET = RuleSet()
+
+def policy_rules(signals, ruleset=None):
+    rs = ruleset or _DEFAULT_RULESET
+    return [rs.actions[i] for i in rs.match(signals)]
+
+_DEFAULT_REGISTRY = None
+
+def regenerate_ads(company, channels, chosen, output_dir=OUTPUT_DIR, registry=None, store=None):
+    global _DEFAULT_REGISTRY
+    if registry is None:
+        registry = _DEFAULT_REGISTRY = _DEFAULT_REGISTRY or CreativeRegistry()
+    return registry.apply(company, channels, chosen, output_dir, store)
+
+# ---------- Engine ----------
+def _ruleset(rules):
+    """RuleSet from a JSON path, a rule list, or an existing (shareable, read-only) RuleSet."""
+    if isinstance(rules, RuleSet): return rules
+    return RuleSet.from_file(rules) if isinstance(rules, str) else RuleSet(rules)
+
+class AutonomyEngine:
+    """Runs the Sense → Think → Act → Learn loop outside Streamlit.
+
+    `state` keeps the dashboard's shape (`signals`, `bandit`, `epsilon`, `last_plan`), so a
+    `st.session_state` dict can be passed in and mutated in place. Creative choice and learning
+    go through an ArrayBandit; `state["bandit"]` is refreshed from it at the end of each `run`.
+    """
+
+    def __init__(self, channels=None, budget_total=5000, company=COMPANY, output_dir=OUTPUT_DIR,
+                 state=None, kpi_rows=None, seed=None, window=None, variants=("A","B"), policy="epsilon",
+                 budget_diff_log=None, creatives=None, source=None, rules=None, sharpness=3.0, cac_penalty=0.0005,
+                 artifacts=None):
+        self.channels = list(channels or CHANNELS)
+        self.budget_total = budget_total
+        self.sharpness = sharpness; self.cac_penalty = cac_penalty
+        self.company = company
+        self.output_dir = output_dir
+        self.state = state if state is not None else {}
+        self.kpis = RollingKPIs(window or len(self.channels)*3).extend(kpi_rows or [])
+        self.rng = random.Random(seed) if seed is not None else random
+        self.source = source or RandomWalkSource(self.rng)
+        self.bandit = ArrayBandit.from_state(self.state.get("bandit"), self.channels, variants, policy=policy,
+                                             epsilon=self.state.setdefault("epsilon", 0.2), rng=np.random.default_rng(seed))
+        self.ticks = 0
+        self.store = None; self._kpi_seen = 0
+        self.artifacts = artifacts  # ArtifactStore for budget / ad writes (None = write inline)
+        self.budget = BudgetWriter(output_dir, diff_log=budget_diff_log, store=artifacts)
+        self.rules = RuleEvaluator(_ruleset(rules))
+        self.creatives = (creatives if isinstance(creatives, CreativeRegistry) else
+                          CreativeRegistry.from_file(creatives) if isinstance(creatives, str) else CreativeRegistry(creatives))
+        self._reward_row = None; self._reward = None
+
+    def load_kpis(self, path=None):
+        """Sync the planning window with the shared KPIStore; returns how many new rows were seen."""
+        store = open_store(path or os.path.join(self.output_dir, "campaign_kpis.csv"))
+        if store is not self.store:
+            self.store = store; self._kpi_seen = 0; self._kpi_gen = None
+        store.refresh()
+        if store.generation != self._kpi_gen:    # first sync, or the CSV was rewritten
+            self.kpis.reset(); self._kpi_seen = 0; self._kpi_gen = store.generation
+        # only the trailing `window` rows can affect the plan, so a cold start skips the history
+        start = max(self._kpi_seen, store.rows - self.kpis.window)
+        self.kpis.extend(store.iter_rows(start))
+        added = store.rows - self._kpi_seen
+        self._kpi_seen = store.rows
+        return added
+
+    def plan(self):
+        scores = score_channels(self.kpis.totals(self.channels), self.cac_penalty)
+        self.bandit.epsilon = self.state.get("epsilon", self.bandit.epsilon)
+        plan = {"weights": softmax_weights(scores, self.channels, self.sharpness), "creative": self.bandit.choose(), "scores": scores}
+        self.state["last_plan"] = plan
+        return plan
+
+    def learn(self, plan):
+        last = self.kpis.last
+        if last is None or last["channel"] not in self.bandit.ch_index: return
+        if last is not self._reward_row:
+            self._reward_row = last
+            self._reward = float(kpi_reward(last.get("impressions", 3000), last.get("clicks", 60), last.get("orders", 6), last.get("spend", 120.0),
+                                           self.cac_penalty))
+        ch = last["channel"]
+        self.bandit.update([self.bandit.ch_index[ch]], [self.bandit.var_index[plan["creative"][ch]]], [self._reward])
+
+    def step(self):
+        """One tick; returns None once a finite signal source (e.g. a replay) is exhausted."""
+        sig = self.source.read(self.state)
+        if sig is None: return None
+        plan = self.plan()
+        budget_file = self.budget.write(plan, self.budget_total, self.channels, tick=self.ticks+1)
+        self.learn(plan)
+        acts = self.rules.step(sig)
+        regenerate_ads(self.company, self.channels, plan["creative"], self.output_dir, self.creatives, self.artifacts)
+        self.ticks += 1
+        return {"step": self.ticks, "signals": dict(sig), "actions": acts, "plan": plan, "budget_file": budget_file}
+
+    def run(self, ticks, keep_log=True):
+        log = []
+        for _ in range(int(ticks)):
+            entry = self.step()
+            if entry is None: break
+            if keep_log: log.append(entry)
+        self.state["bandit"] = self.bandit.to_state()
+        return log
+
+# ---------- CLI ----------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Run the AI Virtual Café autonomy loop headless.")
+    p.add_argument("--ticks", type=int, default=1000)
+    p.add_argument("--budget", type=float, default=5000)
+    p.add_argument("--channels", default=",".join(CHANNELS), help="comma-separated channel names")
+    p.add_argument("--output-dir", default=OUTPUT_DIR)
+    p.add_argument("--kpis", default=None, help="KPI CSV (default: <output-dir>/campaign_kpis.csv)")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--window", type=int, default=None, help="KPI rows in the planning window (default: 3 per channel)")
+    p.add_argument("--variants", default="A,B", help="comma-separated creative variants")
+    p.add_argument("--policy", default="epsilon", choices=["epsilon","thompson","ucb"])
+    p.add_argument("--signals", default=None, help="replay a recorded signal trace (.csv or .jsonl) instead of the random walk")
+    p.add_argument("--speed", type=float, default=0, help="replay speed multiplier vs. recorded timestamps (0 = max speed)")
+    p.add_argument("--signals-url", default=None, help="poll signals from a JSON HTTP endpoint")
+    p.add_argument("--rules", default=None, help="JSON policy rules [{signal, op, threshold, action, cooldown}]")
+    p.add_argument("--creatives", default=None, help="JSON creative config {channel: {file, title, variants}}")
+    p.add_argument("--budget-diff-log", default=None, help="append allocation changes as JSON lines to this file in --output-dir")
+    p.add_argument("--log", action="store_true", help="print every tick as JSON lines")
+    args = p.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    source = None
+    if args.signals: source = ReplaySource(args.signals, speed=args.speed or None)
+    elif args.signals_url: source = HTTPSource(args.signals_url)
+    engine = AutonomyEngine([c.strip() for c in args.channels.split(",") if c.strip()], args.budget,
+                            output_dir=args.output_dir, seed=args.seed, window=args.window,
+                            variants=[v.strip() for v in args.variants.split(",") if v.strip()], policy=args.policy,
+                            budget_diff_log=args.budget_diff_log, creatives=args.creatives, source=source,
+                            rules=args.rules)
+    engine.load_kpis(args.kpis)
+    t0 = time.perf_counter()
+    log = engine.run(args.ticks, keep_log=args.log)
+    dt = time.perf_counter() - t0
+    for entry in log:
+        print(json.dumps(entry, ensure_ascii=False))
+    print(json.dumps({"ticks": engine.ticks, "seconds": round(dt, 4), "ticks_per_sec": round(engine.ticks/max(dt, 1e-9), 1),
+                      "budget_writes": engine.budget.writes, "budget_skips": engine.budget.skips,
+                      "ad_writes": engine.creatives.writes,
+                      "last_plan": engine.state.get("last_plan")}, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
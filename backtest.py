@@ -0,0 +1,174 @@
+# backtest.py
+# Offline backtester: replays a KPI history day by day through sense → think → act → learn with no
+# disk writes, for a grid of (epsilon, softmax sharpness, CAC penalty, bandit policy) configs run
+# across a process pool.
+#   python backtest.py campaign_kpis.csv --epsilon 0.05,0.1,0.2 --sharpness 1,3,10 --cac-penalty 0.0002,0.0005
+#
+# Each day the planner only sees earlier days. The allocation is scored against that day's rows:
+#   reward      — Σ_channel weight × mean per-row reward (CTR − cac_penalty × CPA), summed over days
+#   est_orders  — Σ_channel allocated $ × that day's orders-per-$ on the channel
+# If the history logs the creative that ran (a `creative` or `variant` column), the bandit learns
+# only from rows whose logged creative matches its choice (replay evaluation), and those rows'
+# reward is reported as `creative_reward`. Otherwise every row is credited to the chosen creative,
+# as the live engine does.
+
+import os, csv, json, random, argparse, itertools, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from kpis import RollingKPIs
+from bandit import ArrayBandit, kpi_reward
+from budget import budget_table
+from rules import RuleSet, RuleEvaluator
+from signals import RandomWalkSource, ReplaySource
+from autonomy import score_channels, softmax_weights
+
+DEFAULT_CONFIG = {"epsilon": 0.2, "sharpness": 3.0, "cac_penalty": 0.0005, "policy": "epsilon"}
+
+# ---------- History ----------
+def load_history(path):
+    """KPI CSV → dict of NumPy columns sorted by day, plus channel / creative vocabularies."""
+    cols = {k: [] for k in ("day","channel","impressions","clicks","orders","spend","creative")}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            cols["day"].append(int(float(row.get("day") or 0)))
+            cols["channel"].append(row.get("channel") or "Google")
+            cols["impressions"].append(float(row.get("impressions") or 3000))
+            cols["clicks"].append(float(row.get("clicks") or 0))
+            cols["orders"].append(float(row.get("orders") or 0))
+            cols["spend"].append(float(row.get("spend") or 0))
+            cols["creative"].append(row.get("creative") or row.get("variant") or "")
+    channels = list(dict.fromkeys(cols["channel"]))
+    creatives = sorted({c for c in cols["creative"] if c})
+    ch_code = {c: i for i, c in enumerate(channels)}
+    cr_code = {c: i for i, c in enumerate(creatives)}
+    day = np.array(cols["day"], dtype=np.int64)
+    order = np.argsort(day, kind="stable")
+    hist = {
+        "day": day[order],
+        "channel": np.array([ch_code[c] for c in cols["channel"]], dtype=np.intp)[order],
+        "creative": np.array([cr_code.get(c, -1) for c in cols["creative"]], dtype=np.intp)[order],
+        "channels": channels, "creatives": creatives,
+    }
+    for k in ("impressions","clicks","orders","spend"):
+        hist[k] = np.array(cols[k], dtype=float)[order]
+    return hist
+
+# ---------- Single run ----------
+def backtest(hist, config=None, budget_total=5000, seed=0, window_days=3, signals=None, rules=None):
+    cfg = dict(DEFAULT_CONFIG, **(config or {}))
+    channels = hist["channels"]; C = len(channels)
+    logged = len(hist["creatives"]) > 0
+    variants = hist["creatives"] if logged else ["A","B"]
+    rng = random.Random(seed)
+    bandit = ArrayBandit(channels, variants, policy=cfg["policy"], epsilon=cfg["epsilon"], rng=np.random.default_rng(seed))
+    window = RollingKPIs(C*window_days)
+    source = ReplaySource(signals, loop=True) if signals else RandomWalkSource(rng)
+    evaluator = RuleEvaluator(RuleSet.from_file(rules) if isinstance(rules, str) else RuleSet(rules))
+    state = {}
+
+    day = hist["day"]
+    bounds = np.flatnonzero(np.diff(day)) + 1
+    starts = np.concatenate(([0], bounds)); ends = np.concatenate((bounds, [len(day)]))
+    out = {"reward": 0.0, "uniform_reward": 0.0, "est_orders": 0.0, "spend": 0.0,
+           "creative_reward": 0.0, "matched_rows": 0, "actions": 0, "days": len(starts)}
+    for s, e in zip(starts, ends):
+        sig = source.read(state)
+        out["actions"] += len(evaluator.step(sig)) if sig is not None else 0
+        # think (on earlier days only)
+        scores = score_channels(window.totals(channels), cfg["cac_penalty"])
+        weights = softmax_weights(scores, channels, cfg["sharpness"])
+        pick = bandit.select()
+        # act
+        alloc = budget_table(weights, budget_total, channels)[0]
+        w = np.fromiter((weights[ch] for ch in channels), dtype=float, count=C)
+        # observe this day's rows
+        ch = hist["channel"][s:e]
+        r = kpi_reward(hist["impressions"][s:e], hist["clicks"][s:e], hist["orders"][s:e], hist["spend"][s:e], cfg["cac_penalty"])
+        n_ch = np.bincount(ch, minlength=C)
+        seen = n_ch > 0
+        mean_r = np.bincount(ch, weights=r, minlength=C)[seen] / n_ch[seen]
+        out["reward"] += float(w[seen] @ mean_r)
+        out["uniform_reward"] += float(mean_r.mean())
+        orders = np.bincount(ch, weights=hist["orders"][s:e], minlength=C)
+        spend = np.bincount(ch, weights=hist["spend"][s:e], minlength=C)
+        out["est_orders"] += float(alloc @ (orders / np.maximum(spend, 1e-9)))
+        out["spend"] += float(alloc.sum())
+        # learn
+        if logged:
+            m = hist["creative"][s:e] == pick[ch]
+            bandit.update(ch[m], pick[ch][m], r[m])
+            out["creative_reward"] += float(r[m].sum()); out["matched_rows"] += int(m.sum())
+        else:
+            bandit.update(ch, pick[ch], r)
+        for i in range(s, e):
+            window.push({"channel": channels[hist["channel"][i]], "clicks": hist["clicks"][i],
+                         "orders": hist["orders"][i], "spend": hist["spend"][i]})
+    out["orders_per_dollar"] = out["est_orders"] / out["spend"] if out["spend"] else 0.0
+    out["cost_per_order"] = out["spend"] / out["est_orders"] if out["est_orders"] else None
+    return {"config": cfg, "seed": seed, **out}
+
+# ---------- Grid ----------
+_HIST = None
+
+def _init_worker(hist):
+    global _HIST
+    _HIST = hist
+
+def _run_one(args):
+    config, kw = args
+    return backtest(_HIST, config, **kw)
+
+def config_grid(epsilons=(0.2,), sharpnesses=(3.0,), cac_penalties=(0.0005,), policies=("epsilon",)):
+    return [{"epsilon": e, "sharpness": t, "cac_penalty": c, "policy": p}
+            for e, t, c, p in itertools.product(epsilons, sharpnesses, cac_penalties, policies)]
+
+def run_grid(hist, configs, workers=None, **kw):
+    """Backtest every config; the history is shipped once per worker, not once per config."""
+    tasks = [(cfg, kw) for cfg in configs]
+    if workers == 1 or len(tasks) == 1:
+        _init_worker(hist)
+        return [_run_one(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(hist,)) as pool:
+        return list(pool.map(_run_one, tasks, chunksize=max(1, len(tasks)//(4*(workers or os.cpu_count() or 1)))))
+
+# ---------- CLI ----------
+def _floats(s):
+    return [float(x) for x in s.split(",") if x.strip()]
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Backtest autonomy-loop parameters against a KPI history.")
+    p.add_argument("kpis", help="KPI history CSV (day,channel,impressions,clicks,orders,spend[,creative])")
+    p.add_argument("--epsilon", default="0.2")
+    p.add_argument("--sharpness", default="3", help="softmax inverse temperature(s)")
+    p.add_argument("--cac-penalty", default="0.0005")
+    p.add_argument("--policy", default="epsilon", help="comma-separated: epsilon,thompson,ucb")
+    p.add_argument("--budget", type=float, default=5000)
+    p.add_argument("--window-days", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--signals", default=None, help="recorded signal trace to replay (default: seeded random walk)")
+    p.add_argument("--rules", default=None, help="JSON policy rules")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--json", action="store_true", help="print full results as JSON lines")
+    args = p.parse_args(argv)
+
+    hist = load_history(args.kpis)
+    configs = config_grid(_floats(args.epsilon), _floats(args.sharpness), _floats(args.cac_penalty),
+                          [x.strip() for x in args.policy.split(",") if x.strip()])
+    t0 = time.perf_counter()
+    results = run_grid(hist, configs, workers=args.workers, budget_total=args.budget, seed=args.seed,
+                       window_days=args.window_days, signals=args.signals, rules=args.rules)
+    dt = time.perf_counter() - t0
+    results.sort(key=lambda r: -r["reward"])
+    if args.json:
+        for r in results: print(json.dumps(r))
+    else:
+        print(f"{len(results)} configs × {results[0]['days'] if results else 0} days in {dt:.2f}s")
+        print(f"{'policy':>9} {'epsilon':>8} {'sharp':>6} {'cac_pen':>8} {'reward':>10} {'vs_uniform':>10} {'orders/$':>9} {'creative/row':>12}")
+        for r in results:
+            c = r["config"]
+            print(f"{c['policy']:>9} {c['epsilon']:>8g} {c['sharpness']:>6g} {c['cac_penalty']:>8g} "
+                  f"{r['reward']:>10.4f} {r['reward']-r['uniform_reward']:>+10.4f} {r['orders_per_dollar']:>9.4f} "
+                  f"{(r['creative_reward']/r['matched_rows'] if r['matched_rows'] else float('nan')):>12.5f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bandit.py
+# Array-backed creative bandit: channels × variants count/reward matrices.
+# Policies: epsilon-greedy (the original A/B behaviour), Gaussian Thompson sampling, UCB1.
+
+import numpy as np
+
+POLICIES = ("epsilon", "thompson", "ucb")
+
+def kpi_reward(impressions, clicks, orders, spend, cac_penalty=0.0005):
+    """CTR minus the CPA penalty used by learn_update; works on scalars or arrays."""
+    ctr = np.asarray(clicks, dtype=float) / np.maximum(1.0, np.asarray(impressions, dtype=float))
+    cpa = np.asarray(spend, dtype=float) / np.maximum(1.0, np.asarray(orders, dtype=float))
+    return ctr - cac_penalty*cpa
+
+class ArrayBandit:
+    def __init__(self, channels, variants=("A","B"), policy="epsilon", epsilon=0.2, ucb_c=1.0, prior_std=0.05, rng=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown bandit policy {policy!r}; expected one of {POLICIES}")
+        self.channels = list(channels)
+        self.variants = list(variants)
+        self.ch_index = {ch: i for i, ch in enumerate(self.channels)}
+        self.var_index = {v: j for j, v in enumerate(self.variants)}
+        self.policy = policy
+        self.epsilon = epsilon
+        self.ucb_c = ucb_c
+        self.prior_std = prior_std
+        self.rng = rng if rng is not None else np.random.default_rng()
+        shape = (len(self.channels), len(self.variants))
+        self.n = np.zeros(shape, dtype=np.int64)
+        self.reward = np.zeros(shape)
+        self.reward_sq = np.zeros(shape)
+
+    # ---------- state dict interop ({ch: {variant: {"reward", "reward_sq", "n"}}}) ----------
+    @classmethod
+    def from_state(cls, bandit_state, channels, variants=("A","B"), **kw):
+        b = cls(channels, variants, **kw)
+        for ch, arms in (bandit_state or {}).items():
+            i = b.ch_index.get(ch)
+            if i is None: continue
+            for v, arm in arms.items():
+                j = b.var_index.get(v)
+                if j is None: continue
+                n = b.n[i, j] = arm.get("n", 0)
+                r = b.reward[i, j] = arm.get("reward", 0.0)
+                # states saved before reward_sq was kept: assume zero variance (mean² · n)
+                b.reward_sq[i, j] = arm["reward_sq"] if "reward_sq" in arm else (r*r/n if n else 0.0)
+        return b
+
+    def to_state(self):
+        return {ch: {v: {"reward": float(self.reward[i, j]), "reward_sq": float(self.reward_sq[i, j]), "n": int(self.n[i, j])}
+                     for j, v in enumerate(self.variants)}
+                for i, ch in enumerate(self.channels)}
+
+    # ---------- selection ----------
+    def means(self):
+        return self.reward / np.maximum(1, self.n)
+
+    def select(self):
+        """One variant index per channel, as an int array."""
+        C, V = self.n.shape
+        if self.policy == "epsilon":
+            pick = self.means().argmax(axis=1)
+            explore = self.rng.random(C) < self.epsilon
+            if explore.any():
+                pick[explore] = self.rng.integers(0, V, explore.sum())
+            return pick
+        if self.policy == "thompson":
+            n = self.n.astype(float)
+            mean = self.reward / (n + 1.0)
+            var = np.where(n > 1, self.reward_sq/np.maximum(1.0, n) - (self.reward/np.maximum(1.0, n))**2, 0.0)
+            std = np.sqrt(np.maximum(var, 0.0) + self.prior_std**2) / np.sqrt(n + 1.0)
+            return (mean + std*self.rng.standard_normal((C, V))).argmax(axis=1)
+        total = np.maximum(1, self.n.sum(axis=1, keepdims=True))
+        bonus = self.ucb_c*np.sqrt(2.0*np.log(total) / np.maximum(1, self.n))
+        return np.where(self.n == 0, np.inf, self.means() + bonus).argmax(axis=1)
+
+    def choose(self):
+        return {ch: self.variants[j] for ch, j in zip(self.channels, self.select())}
+
+    # ---------- learning ----------
+    def update(self, ch_idx, var_idx, rewards):
+        """Batched update: parallel arrays of channel index, variant index and reward."""
+        ch_idx = np.asarray(ch_idx, dtype=np.intp); var_idx = np.asarray(var_idx, dtype=np.intp)
+        rewards = np.asarray(rewards, dtype=float)
+        np.add.at(self.n, (ch_idx, var_idx), 1)
+        np.add.at(self.reward, (ch_idx, var_idx), rewards)
+        np.add.at(self.reward_sq, (ch_idx, var_idx), rewards*rewards)
+
+    def update_rows(self, rows, chosen, cac_penalty=0.0005):
+        """Credit each KPI row to the variant `chosen` ({channel: variant}) ran on its channel."""
+        rows = [r for r in rows if r["channel"] in self.ch_index]
+        if not rows: return 0
+        ch_idx = [self.ch_index[r["channel"]] for r in rows]
+        var_idx = [self.var_index.get(chosen.get(r["channel"]), 0) for r in rows]
+        rewards = kpi_reward([r.get("impressions", 3000) for r in rows], [r.get("clicks", 60) for r in rows],
+                             [r.get("orders", 6) for r in rows], [r.get("spend", 120.0) for r in rows], cac_penalty)
+        self.update(ch_idx, var_idx, rewards)
+        return len(rows)
@@ -0,0 +1,193 @@
+# bench_autonomy.py
+# Benchmarks for the autonomy loop and KPI analytics hot paths.
+#
+#   python benchmarks/bench_autonomy.py                      # loop: 3 / 30 / 300 channels; data: 1k / 100k rows
+#                                                            #   × 3 / 10 / 50 / 200 channels
+#   python benchmarks/bench_autonomy.py --full               # adds the 10M-row parse / metrics cases
+#   python benchmarks/bench_autonomy.py --save main          # store results as benchmarks/.results/main.json
+#   python benchmarks/bench_autonomy.py --compare main       # diff against a stored run; exit 1 on regressions
+#   python benchmarks/bench_autonomy.py --compare main --save main   # ... then make this run the new baseline
+#
+# Each case reports the median and best per-call time over several repeats; a case is flagged as a
+# regression when its median is slower than the stored one by more than --threshold (default 25%).
+
+import os, sys, json, time, random, argparse, tempfile, statistics, platform, itertools, shutil
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from autonomy import AutonomyEngine, think_plan, learn_update, read_kpis
+from budget import BudgetWriter
+from creatives import CreativeRegistry
+from kpis import KPIStore
+from analytics import compute_metrics, KPIRollup
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", ".results")
+
+# ---------- Harness ----------
+def measure(fn, setup=None, repeat=5, min_time=0.05):
+    """Per-call seconds. Without `setup`, calls are batched until a batch takes `min_time` and `repeat`
+    batches are timed; with `setup`, each sample is one call on a fresh `setup()` result (untimed)."""
+    if setup:
+        samples = []
+        for _ in range(repeat):
+            arg = setup()
+            t0 = time.perf_counter(); fn(arg)
+            samples.append(time.perf_counter() - t0)
+        n = 1
+    else:
+        n = 1
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(n): fn()
+            dt = time.perf_counter() - t0
+            if dt >= min_time or n >= 1 << 20: break
+            n *= 2
+        samples = [dt/n]
+        for _ in range(repeat - 1):
+            t0 = time.perf_counter()
+            for _ in range(n): fn()
+            samples.append((time.perf_counter() - t0)/n)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "calls": n, "repeat": repeat}
+
+def channel_names(n):
+    return ["Google","Instagram","LinkedIn"] if n == 3 else [f"ch{i:03d}" for i in range(n)]
+
+def kpi_rows(channels, days, seed=0):
+    rng = random.Random(seed)
+    return [{"day": d, "channel": ch, "impressions": 3000, "clicks": rng.randint(30, 90),
+             "orders": rng.randint(1, 9), "spend": round(rng.uniform(50, 150), 2)}
+            for d in range(1, days + 1) for ch in channels]
+
+def write_kpi_csv(path, rows, channels):
+    rng = random.Random(rows)
+    with open(path, "w") as f:
+        f.write("day,channel,impressions,clicks,orders,spend\n")
+        C = len(channels); chunk = []
+        for i in range(rows):
+            chunk.append(f"{i//C + 1},{channels[i % C]},3000,{rng.randint(30,90)},{rng.randint(1,9)},{rng.uniform(50,150):.2f}\n")
+            if len(chunk) >= 100_000:
+                f.writelines(chunk); chunk = []
+        f.writelines(chunk)
+
+# ---------- Cases ----------
+# Each case yields (name, params, thunk); the thunk runs the measurement so --only can skip it.
+def loop_cases(workdir, n_channels):
+    channels = channel_names(n_channels)
+    rows = kpi_rows(channels, 30)
+    out_dir = os.path.join(workdir, f"loop_{n_channels}"); os.makedirs(out_dir, exist_ok=True)
+    config = {ch: {"file": f"ads_{ch.lower()}.md", "title": f"{ch} Ads",
+                   "variants": {"A": {"Headline": "Order now"}, "B": {"Headline": "Book today"}}} for ch in channels}
+    engine = AutonomyEngine(channels, 5000, output_dir=out_dir, kpi_rows=rows, seed=1, creatives=config)
+    plan = engine.plan()
+    flip = [plan, {**plan, "creative": {ch: ("B" if v == "A" else "A") for ch, v in plan["creative"].items()}}]
+    tick = {"i": 0}
+    def alternate():
+        tick["i"] ^= 1
+        return flip[tick["i"]]
+    p = {"channels": n_channels}
+    yield "think_plan[dict]", p, lambda: measure(lambda: think_plan({}, rows, channels, random))
+    yield "engine.plan", p, lambda: measure(engine.plan)
+    yield "learn_update[dict]", p, lambda: measure(lambda: learn_update({}, plan, rows))
+    yield "engine.learn", p, lambda: measure(lambda: engine.learn(plan))
+    writer = BudgetWriter(out_dir)
+    yield "act_apply[changed]", p, lambda: measure(lambda: writer.write(alternate(), 5000, channels))
+    yield "act_apply[unchanged]", p, lambda: measure(lambda: writer.write(plan, 5000, channels))
+    reg = CreativeRegistry(config)
+    yield "regenerate_ads[changed]", p, lambda: measure(lambda: reg.apply("Bench Café", channels, alternate()["creative"], out_dir))
+    yield "regenerate_ads[unchanged]", p, lambda: measure(lambda: reg.apply("Bench Café", channels, plan["creative"], out_dir))
+    yield "engine.step", p, lambda: measure(engine.step)
+
+def data_cases(workdir, n_rows, n_channels=3):
+    channels = channel_names(n_channels)
+    path = os.path.join(workdir, f"kpis_{n_rows}_{n_channels}.csv")
+    if not os.path.exists(path): write_kpi_csv(path, n_rows, channels)
+    p = {"rows": n_rows, "channels": n_channels}
+    big = n_rows >= 1_000_000
+    rep = 3 if big else 5
+    yield "parse[pd.read_csv]", p, lambda: measure(lambda: pd.read_csv(path), repeat=rep)
+    if not big:
+        yield "parse[csv.DictReader]", p, lambda: measure(lambda: read_kpis(path), repeat=rep)
+    cache = os.path.join(workdir, f"cache_{n_rows}_{n_channels}")
+    def cold_store():
+        shutil.rmtree(cache, ignore_errors=True)
+        return KPIStore(path, cache)
+    yield "parse[KPIStore cold]", p, lambda: measure(lambda s: s.refresh(), setup=cold_store, repeat=rep)
+    store = KPIStore(path, cache); store.refresh()
+    yield "parse[KPIStore warm refresh]", p, lambda: measure(store.refresh, repeat=rep)
+    def fresh_store():
+        s = KPIStore(path, cache); s._frame = None
+        return s
+    yield "KPIStore.frame", p, lambda: measure(lambda s: s.frame(), setup=fresh_store, repeat=rep)
+    df = store.frame()
+    yield "compute_metrics", p, lambda: measure(lambda: compute_metrics(df), repeat=rep)
+    yield "KPIRollup cold", p, lambda: measure(lambda r: r.update(), setup=lambda: KPIRollup(KPIStore(path, cache)), repeat=rep)
+    rollup = KPIRollup(store); rollup.update()
+    yield "KPIRollup unchanged", p, lambda: measure(rollup.update, repeat=rep)
+    def cold_views():
+        rollup._views = {}
+        return rollup
+    yield "KPIRollup.view[switch]", p, lambda: measure(lambda r: r.view(channels[-1]), setup=cold_views, repeat=rep)
+
+# ---------- Runner ----------
+def run(rows, channels, data_channels=(3,), only=None):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="operai-bench-") as workdir:
+        cases = itertools.chain((c for n in channels for c in loop_cases(workdir, n)),
+                                (c for n in rows for ch in data_channels for c in data_cases(workdir, n, ch)))
+        for name, params, bench in cases:
+            key = name + "".join(f"[{k}={v}]" for k, v in params.items())
+            if only and only not in key: continue
+            res = bench()
+            results.append({"name": name, "params": params, "key": key, **res})
+            print(f"{key:<58} median {fmt(res['median_s']):>10}  best {fmt(res['min_s']):>10}", flush=True)
+    return results
+
+def fmt(s):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if s >= scale: return f"{s/scale:.3f} {unit}"
+    return f"{s/1e-9:.1f} ns"
+
+def compare(results, baseline, threshold):
+    base = {r["key"]: r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nvs. {baseline['label']} ({baseline['created']}):")
+    for r in results:
+        b = base.get(r["key"])
+        if not b: continue
+        ratio = r["median_s"]/b["median_s"] if b["median_s"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1/(1 + threshold) else "")
+        regressions += flag == "REGRESSION"
+        print(f"{r['key']:<58} {ratio:6.2f}x  {flag}")
+    return regressions
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the autonomy loop and KPI analytics paths.")
+    p.add_argument("--rows", default="1000,100000", help="comma-separated KPI row counts")
+    p.add_argument("--channels", default="3,30,300", help="comma-separated channel counts for the loop cases")
+    p.add_argument("--data-channels", default="3,10,50,200", help="comma-separated channel counts for the KPI data cases")
+    p.add_argument("--full", action="store_true", help="also run the 10M-row cases")
+    p.add_argument("--only", default=None, help="substring filter on case keys")
+    p.add_argument("--save", default=None, metavar="LABEL")
+    p.add_argument("--compare", default=None, metavar="LABEL")
+    p.add_argument("--threshold", type=float, default=0.25)
+    args = p.parse_args(argv)
+    rows = [int(x) for x in args.rows.split(",") if x] + ([10_000_000] if args.full else [])
+    channels = [int(x) for x in args.channels.split(",") if x]
+    data_channels = [int(x) for x in args.data_channels.split(",") if x]
+    baseline = None
+    if args.compare:    # read before running: --save with the same label overwrites it
+        with open(os.path.join(RESULTS_DIR, f"{args.compare}.json")) as f: baseline = json.load(f)
+
+    results = run(rows, channels, data_channels, args.only)
+    doc = {"label": args.save, "created": datetime.now().isoformat(timespec="seconds"),
+           "python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, f"{args.save}.json"), "w") as f: json.dump(doc, f, indent=2)
+    if baseline and compare(results, baseline, args.threshold): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
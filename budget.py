@@ -0,0 +1,74 @@
+# budget.py
+# Budget allocation output stage for act_apply: vectorized table, change detection, atomic writes.
+
+import os, json, hashlib
+from datetime import datetime
+import numpy as np
+from artifacts import ArtifactStore
+
+BUDGET_FIELDS = ["channel","day","daily_budget","creative"]
+
+def budget_table(weights, budget_total, channels, days=14):
+    """days × channels array of daily allocations (rounded to cents)."""
+    default = 1/len(channels) if channels else 0.0
+    w = np.fromiter((weights.get(ch, default) for ch in channels), dtype=float, count=len(channels))
+    per_day = np.round((budget_total/float(days)) * w, 2)
+    return np.broadcast_to(per_day, (days, len(channels)))
+
+def _csv_field(s):
+    return '"' + s.replace('"', '""') + '"' if any(c in s for c in ',"\r\n') else s
+
+class BudgetWriter:
+    """Writes campaign_budget.csv only when the allocation actually changes.
+
+    The plan hash covers the rounded table, channel order and creatives, so ticks whose plan rounds
+    to the same budget cost one hash and no I/O. With `diff_log` set, every write also appends a JSON
+    line listing the per-channel allocation / creative changes since the previous write. Writes go
+    through `store` (an ArtifactStore; write-through by default).
+    """
+
+    def __init__(self, output_dir, fname="campaign_budget.csv", days=14, diff_log=None, store=None):
+        self.path = os.path.join(output_dir, fname)
+        self.days = days
+        self.diff_log = os.path.join(output_dir, diff_log) if diff_log else None
+        self.last_hash = None
+        self.last = None            # {channel: (daily_budget, creative)} of the last write
+        self.writes = 0; self.skips = 0
+        self.store = store or ArtifactStore()
+
+    def write(self, plan, budget_total, channels, tick=None):
+        table = budget_table(plan["weights"], budget_total, channels, self.days)
+        creatives = [plan["creative"].get(ch,"A") for ch in channels]
+        h = hashlib.blake2b(np.ascontiguousarray(table[0]).tobytes(), digest_size=16)
+        h.update("\x1f".join(channels).encode()); h.update(b"\x1e"); h.update("\x1f".join(creatives).encode())
+        digest = h.hexdigest()
+        if digest == self.last_hash and self.store.exists(self.path):
+            self.skips += 1
+            return self.path
+        per_day = table[0].tolist()
+        parts = [(_csv_field(ch) + ",", f",{alloc!r},{_csv_field(cr)}") for ch, alloc, cr in zip(channels, per_day, creatives)]
+        lines = [",".join(BUDGET_FIELDS)]
+        for day in range(1, self.days+1):
+            lines.extend(f"{head}{day}{tail}" for head, tail in parts)
+        self.store.write(self.path, "\r\n".join(lines) + "\r\n")
+        current = {ch: (alloc, cr) for ch, alloc, cr in zip(channels, per_day, creatives)}
+        if self.diff_log: self._log_diff(current, tick)
+        self.last_hash = digest; self.last = current
+        self.writes += 1
+        return self.path
+
+    def _log_diff(self, current, tick):
+        prev = self.last or {}
+        changes = {}
+        for ch, (alloc, cr) in current.items():
+            old = prev.get(ch)
+            if old is None:
+                changes[ch] = {"daily_budget": [None, alloc], "creative": [None, cr]}
+                continue
+            c = {}
+            if old[0] != alloc: c["daily_budget"] = [old[0], alloc]
+            if old[1] != cr: c["creative"] = [old[1], cr]
+            if c: changes[ch] = c
+        for ch in prev.keys() - current.keys():
+            changes[ch] = {"daily_budget": [prev[ch][0], None], "creative": [prev[ch][1], None]}
+        self.store.append(self.diff_log, json.dumps({"tick": tick, "ts": datetime.now().isoformat(), "changes": changes}, ensure_ascii=False) + "\n")
@@ -0,0 +1,83 @@
+# creatives.py
+# Creative registry for regenerate_ads: per channel/variant copy templates, loaded from config,
+# rendered once and written only when the chosen variant (or company) changes.
+
+import os, json
+
+DEFAULT_CREATIVES = {
+    "Instagram": {"file": "ads_instagram.md", "title": "Instagram Ads", "variants": {
+        "A": {"Headline": "Skip the line ☕", "Body": "Order online — pickup in 5 minutes.", "CTA": "Try it now"},
+        "B": {"Headline": "Your coffee, your way", "Body": "Personalized drinks, delivered fast.", "CTA": "Order today"},
+    }},
+    "Google": {"file": "ads_google.md", "title": "Google Ads", "variants": {
+        "A": {"Headline": "Order Coffee Online", "Desc": "2-minute order. 5-minute pickup."},
+        "B": {"Headline": "Reserve Your Table", "Desc": "Book a table, skip the wait."},
+    }},
+    "LinkedIn": {"file": "ads_linkedin.md", "title": "LinkedIn Ads", "variants": {
+        "A": {"Headline": "Fuel your standups", "Body": "Office pickup powered by AI Virtual Café."},
+        "B": {"Headline": "Coffee for teams", "Body": "Subscriptions for teams & meetings."},
+    }},
+}
+
+class CreativeRegistry:
+    """Precompiled ad copy per (channel, variant).
+
+    `config` maps channel → {"file", "title", "variants": {variant: {field: text}}}; channel names
+    match case-insensitively. Variants missing from a channel's config fall back to its last
+    configured variant (the old A-else-B behaviour). `apply` remembers what each file last received
+    and skips rendering and writing when nothing changed.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or DEFAULT_CREATIVES
+        self.channels = {}
+        for ch, spec in self.config.items():
+            variants = spec.get("variants") or {}
+            if not variants:
+                raise ValueError(f"Creative config for {ch!r} has no variants")
+            bodies = {v: "".join(f"\n{k}: {text}" for k, text in fields.items()) for v, fields in variants.items()}
+            self.channels[ch.lower()] = {
+                "file": spec.get("file") or f"ads_{ch.lower().replace(' ', '_')}.md",
+                "title": spec.get("title") or f"{ch} Ads",
+                "bodies": bodies, "fallback": list(bodies)[-1],
+            }
+        self._written = {}          # file → (channel, variant, company) last written
+        self.writes = 0; self.skips = 0
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def render(self, company, channel, variant):
+        spec = self.channels.get(channel.lower())
+        if spec is None: return None
+        body = spec["bodies"].get(variant)
+        if body is None: body = spec["bodies"][spec["fallback"]]
+        return spec["file"], f"# {spec['title']} ({variant}) — {company}{body}"
+
+    def apply(self, company, channels, chosen, output_dir, store=None):
+        """Write ad copy for `chosen` ({channel: variant}); returns the files actually written.
+
+        With `store` (an ArtifactStore) the write is queued there instead of done inline.
+        """
+        written = []
+        for ch in channels:
+            spec = self.channels.get(ch.lower())
+            if spec is None: continue
+            variant = chosen.get(ch,"A")
+            key = (ch.lower(), variant, company)
+            fname = spec["file"]
+            if self._written.get((output_dir, fname)) == key:
+                self.skips += 1
+                continue
+            fname, copy = self.render(company, ch, variant)
+            if store is not None:
+                store.write(os.path.join(output_dir, fname), copy)
+            else:
+                with open(os.path.join(output_dir, fname), 'w') as f:
+                    f.write(copy)
+            self._written[(output_dir, fname)] = key
+            self.writes += 1
+            written.append(fname)
+        return written
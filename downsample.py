@@ -0,0 +1,51 @@
+# downsample.py
+# Server-side downsampling for line charts: keep at most `max_points` points per series.
+#   lttb   — Largest-Triangle-Three-Buckets; preserves the visual shape of the line
+#   minmax — min and max of each bucket; preserves spikes and extremes exactly
+# Both return sorted row indices that always include the first and last point.
+
+import numpy as np
+
+MAX_POINTS = 500
+
+def lttb(x, y, n):
+    x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+    N = len(x)
+    if n >= N or n < 3: return np.arange(N) if n >= N else np.array([0, N - 1][:max(n, 0)])
+    edges = np.linspace(1, N - 1, n - 1).astype(np.intp)      # n-2 buckets between the endpoints
+    out = np.empty(n, dtype=np.intp); out[0] = 0; out[-1] = N - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else N)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()         # centroid of the next bucket
+        area = np.abs((x[a] - cx)*(y[lo:hi] - y[a]) - (x[a] - x[lo:hi])*(cy - y[a]))
+        a = out[i + 1] = lo + int(area.argmax())
+    return out
+
+def minmax(x, y, n):
+    y = np.asarray(y, dtype=float)
+    N = len(y)
+    if n >= N or n < 4: return np.arange(N) if n >= N else np.array([0, N - 1][:max(n, 0)])
+    k = (n - 2)//2
+    starts = np.linspace(1, N - 1, k + 1).astype(np.intp)[:-1]
+    seg = np.split(np.arange(1, N - 1), starts[1:] - 1)
+    idx = [0]
+    for s in seg:
+        if len(s): idx += [s[y[s].argmin()], s[y[s].argmax()]]
+    idx.append(N - 1)
+    return np.unique(idx)
+
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+def downsample(x, y, max_points=MAX_POINTS, method="lttb"):
+    """Row indices of the points to plot."""
+    return METHODS[method](x, y, max_points)
+
+def downsample_series(s, max_points=MAX_POINTS, method="lttb"):
+    """pandas Series (numeric or datetime index) → at most `max_points` of its points."""
+    if len(s) <= max_points: return s
+    x = s.index.values
+    if np.issubdtype(x.dtype, np.datetime64): x = x.astype(np.int64)
+    elif not np.issubdtype(x.dtype, np.number): x = np.arange(len(s))
+    return s.iloc[downsample(x, s.values, max_points, method)]
@@ -0,0 +1,295 @@
+# kpis.py
+# KPI ingestion + aggregation for the autonomy loop and the Analytics tab (no Streamlit import).
+#
+# campaign_kpis.csv is treated as append-only: KPIStore tails it by byte offset into a columnar
+# cache of raw little-endian arrays (one file per column) that is memory-mapped on read, so a cold
+# start only parses the CSV once and later reruns only parse newly appended rows.
+# Several processes may share one cache (the CLI and the dashboard both use OUTPUT_DIR): every
+# change to it happens under an exclusive lock file, after re-reading what the others committed.
+
+import os, csv, json, threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+KPI_FIELDS = ["day","channel","impressions","clicks","orders","spend"]
+KPI_DTYPES = {"day": "<i4", "channel": "<i4", "impressions": "<i8", "clicks": "<i8", "orders": "<i8", "spend": "<f8"}
+
+def parse_kpi_row(row):
+    row["clicks"] = int(row.get("clicks",0))
+    row["orders"] = int(row.get("orders",0))
+    row["spend"] = float(row.get("spend",0))
+    row["channel"] = row.get("channel","Google")
+    row["impressions"] = int(row.get("impressions",3000))
+    return row
+
+# ---------- Rolling window ----------
+class RollingKPIs:
+    """Per-channel clicks/orders/spend over the last `window` KPI rows, updated in O(1) per row.
+
+    Matches the old `kpi_rows[-len(channels)*3:]` slice when `window = len(channels)*3`.
+    """
+
+    def __init__(self, window=9):
+        self.window = max(1, int(window))
+        self.reset()
+
+    def reset(self):
+        self.rows = deque()
+        self.sums = {}
+        self.last = None
+        self.total_rows = 0
+
+    def push(self, row):
+        ch = row["channel"]
+        m = self.sums.get(ch)
+        if m is None:
+            m = self.sums[ch] = {"clicks":0, "leads":0, "spend":0.0, "n":0}
+        clicks = int(row.get("clicks",0))
+        leads = int(row.get("orders", row.get("leads", 0) or 0))
+        spend = float(row.get("spend",0))
+        m["clicks"] += clicks; m["leads"] += leads; m["spend"] += spend; m["n"] += 1
+        self.rows.append((ch, clicks, leads, spend))
+        self.last = row
+        self.total_rows += 1
+        if len(self.rows) > self.window:
+            och, oc, ol, os_ = self.rows.popleft()
+            o = self.sums[och]
+            o["n"] -= 1
+            if o["n"] == 0:
+                o["clicks"] = 0; o["leads"] = 0; o["spend"] = 0.0   # drop float drift once a channel leaves the window
+            else:
+                o["clicks"] -= oc; o["leads"] -= ol; o["spend"] -= os_
+
+    def extend(self, rows):
+        for r in rows: self.push(r)
+        return self
+
+    def totals(self, channels):
+        out = {}
+        for ch in channels:
+            m = self.sums.get(ch)
+            out[ch] = {"clicks": m["clicks"], "leads": m["leads"], "spend": m["spend"]} if m else {"clicks":0, "leads":0, "spend":0.0}
+        return out
+
+# ---------- Columnar cache ----------
+_DEFAULTS = {"day": 0, "impressions": 3000, "clicks": 0, "orders": 0, "spend": 0.0}
+_BULK_BYTES = 1 << 20
+
+def _int(v, default=0):
+    return int(float(v)) if v not in (None, "") else default
+
+def _float(v, default=0.0):
+    return float(v) if v not in (None, "") else default
+
+@contextmanager
+def _cache_lock(cache_dir):
+    with open(os.path.join(cache_dir, ".lock"), "a+b") as f:
+        if fcntl: fcntl.flock(f, fcntl.LOCK_EX)
+        else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl: fcntl.flock(f, fcntl.LOCK_UN)
+            else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class KPIStore:
+    """Append-only columnar cache of a KPI CSV.
+
+    `refresh()` stats the CSV and parses only bytes past the cached offset; a shrunk file or a
+    changed header rebuilds the cache. Columns are served as memory-mapped NumPy arrays, with
+    `channel` stored as int codes into `self.channels`.
+    """
+
+    def __init__(self, csv_path, cache_dir=None):
+        self.csv_path = os.path.abspath(csv_path)
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(self.csv_path), ".kpi_cache", os.path.basename(self.csv_path))
+        self.lock = threading.RLock()
+        self.version = 0            # bumped on every change, usable as a cache key
+        self.generation = 0         # bumped only when the cache is rebuilt from scratch
+        self._maps = None; self._frame = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with _cache_lock(self.cache_dir): self._load_meta()
+
+    # ---------- meta ----------
+    def _col_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.bin")
+
+    def _load_meta(self):
+        try:
+            with open(os.path.join(self.cache_dir, "meta.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+        if not meta or meta.get("dtypes") != KPI_DTYPES:
+            self._reset_cache(); return
+        self.offset = meta["offset"]; self.rows = meta["rows"]
+        self.header = meta["header"]; self.fields = meta["fields"]
+        self.channels = meta["channels"]; self._ch_code = {c: i for i, c in enumerate(self.channels)}
+        for name, dt in KPI_DTYPES.items():   # trim column bytes written after the last committed meta
+            path = self._col_path(name)
+            if not os.path.exists(path): self._reset_cache(); return
+            want = self.rows*np.dtype(dt).itemsize
+            if os.path.getsize(path) < want: self._reset_cache(); return
+            if os.path.getsize(path) > want:
+                with open(path, "r+b") as f: f.truncate(want)
+
+    def _resync(self):
+        """Adopt rows / channels another process committed since we last looked (cache lock held)."""
+        before = (self.offset, self.rows, self.header, len(self.channels))
+        self._load_meta()
+        if (self.offset, self.rows, self.header, len(self.channels)) != before:
+            self._maps = None; self._frame = None
+            self.version += 1
+            if self.rows < before[1] or self.header != before[2]: self.generation += 1
+
+    def _save_meta(self):
+        meta = {"offset": self.offset, "rows": self.rows, "header": self.header, "fields": self.fields,
+                "channels": self.channels, "dtypes": KPI_DTYPES}
+        tmp = os.path.join(self.cache_dir, "meta.json.tmp")
+        with open(tmp, "w") as f: json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.cache_dir, "meta.json"))
+
+    def _reset_cache(self):
+        self.offset = 0; self.rows = 0; self.header = None; self.fields = None
+        self.channels = []; self._ch_code = {}
+        for name in KPI_DTYPES:
+            open(self._col_path(name), "wb").close()
+        self._maps = None; self._frame = None
+        self.version += 1; self.generation += 1
+
+    # ---------- ingestion ----------
+    def refresh(self):
+        """Parse rows appended since the last refresh; returns the number of new rows."""
+        with self.lock, _cache_lock(self.cache_dir):
+            self._resync()
+            if not os.path.exists(self.csv_path): return 0
+            size = os.path.getsize(self.csv_path)
+            if size < self.offset or (self.header and not self._header_matches()):
+                self._reset_cache(); self._save_meta()
+            if size == self.offset: return 0
+            with open(self.csv_path, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read(size - self.offset)
+            end = chunk.rfind(b"\n") + 1           # leave a partially written last line for next time
+            if end == 0: return 0
+            body = chunk[:end]
+            if self.header is None:
+                nl = body.index(b"\n") + 1
+                self.header = body[:nl].decode("utf-8").rstrip("\r\n")
+                self.fields = next(csv.reader([self.header]))
+                body = body[nl:]
+            added = self._append(body)
+            self.offset += end
+            self._save_meta()
+            return added
+
+    def _header_matches(self):
+        with open(self.csv_path, "rb") as f:
+            return f.readline().decode("utf-8").rstrip("\r\n") == self.header
+
+    def _append(self, body):
+        cols = None
+        if len(body) >= _BULK_BYTES:
+            try:
+                cols = self._parse_bulk(body)
+            except (ImportError, ValueError):
+                cols = None
+        if cols is None:
+            cols = self._parse_rows([v for v in csv.reader(body.decode("utf-8").splitlines()) if v])
+        n = len(cols["channel"])
+        if not n: return 0
+        for name, dt in KPI_DTYPES.items():
+            with open(self._col_path(name), "ab") as f:
+                np.asarray(cols[name], dtype=dt).tofile(f)
+        self.rows += n
+        self._maps = None; self._frame = None
+        self.version += 1
+        return n
+
+    def _code(self, ch):
+        code = self._ch_code.get(ch)
+        if code is None:
+            code = self._ch_code[ch] = len(self.channels); self.channels.append(ch)
+        return code
+
+    def _parse_bulk(self, body):
+        # cold loads of a long history: let pandas' C parser do the splitting when it is installed
+        import io
+        import pandas as pd
+        df = pd.read_csv(io.BytesIO(body), header=None, names=self.fields, dtype={"channel": str}, skip_blank_lines=True)
+        cols = {}
+        for name in KPI_FIELDS:
+            if name == "channel":
+                ch = df["channel"].fillna("Google") if "channel" in df else pd.Series(["Google"]*len(df))
+                codes, uniq = pd.factorize(ch)
+                lut = np.array([self._code(c) for c in uniq], dtype=KPI_DTYPES[name])
+                cols[name] = lut[codes] if len(uniq) else np.empty(0, dtype=KPI_DTYPES[name])
+            elif name in df:
+                cols[name] = pd.to_numeric(df[name], errors="raise").fillna(_DEFAULTS[name]).to_numpy(np.float64)
+            else:
+                cols[name] = np.full(len(df), _DEFAULTS[name])
+        return cols
+
+    def _parse_rows(self, rows):
+        idx = {name: self.fields.index(name) if name in self.fields else None for name in KPI_FIELDS}
+        cols = {name: [] for name in KPI_FIELDS}
+        for vals in rows:
+            get = lambda name: vals[idx[name]] if idx[name] is not None and idx[name] < len(vals) else None
+            cols["channel"].append(self._code(get("channel") or "Google"))
+            cols["spend"].append(_float(get("spend"), _DEFAULTS["spend"]))
+            for name in ("day","impressions","clicks","orders"):
+                cols[name].append(_int(get(name), _DEFAULTS[name]))
+        return cols
+
+    # ---------- serving ----------
+    def columns(self):
+        with self.lock:
+            if self._maps is None:
+                self._maps = {name: (np.memmap(self._col_path(name), dtype=dt, mode="r", shape=(self.rows,)) if self.rows
+                                     else np.empty(0, dtype=dt)) for name, dt in KPI_DTYPES.items()}
+            return self._maps
+
+    def channel_names(self, codes):
+        return np.asarray(self.channels, dtype=object)[codes] if len(codes) else np.empty(0, dtype=object)
+
+    def iter_rows(self, start=0, stop=None):
+        """KPI rows as dicts (the shape parse_kpi_row produces), for the planner."""
+        cols = self.columns()
+        stop = self.rows if stop is None else min(stop, self.rows)
+        for i in range(max(0, start), stop):
+            yield {"day": int(cols["day"][i]), "channel": self.channels[cols["channel"][i]],
+                   "impressions": int(cols["impressions"][i]), "clicks": int(cols["clicks"][i]),
+                   "orders": int(cols["orders"][i]), "spend": float(cols["spend"][i])}
+
+    def frame(self):
+        """pandas DataFrame view of the cache (rebuilt only when rows were added)."""
+        import pandas as pd
+        with self.lock:
+            if self._frame is None:
+                cols = self.columns()
+                self._frame = pd.DataFrame({
+                    "day": np.array(cols["day"]),
+                    "channel": pd.Categorical.from_codes(np.array(cols["channel"]), categories=list(self.channels)) if self.rows
+                               else pd.Categorical([]),
+                    "impressions": np.array(cols["impressions"]), "clicks": np.array(cols["clicks"]),
+                    "orders": np.array(cols["orders"]), "spend": np.array(cols["spend"]),
+                })
+            return self._frame
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def open_store(csv_path, cache_dir=None):
+    """Process-wide KPIStore per CSV, so the dashboard and engines share one writer of the cache."""
+    key = os.path.abspath(csv_path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = KPIStore(csv_path, cache_dir)
+        return store
@@ -0,0 +1,136 @@
+# rules.py
+# Declarative policy rules for the Act step.
+# A rule is {"signal", "op", "threshold", "action", "cooldown"} (cooldown in ticks, default 0).
+# RuleSet compiles rules into a per-signal sorted threshold index; RuleEvaluator adds per-location
+# state so each tick only re-evaluates signals whose value changed, and applies cooldowns.
+
+import json, bisect
+import numpy as np
+
+DEFAULT_RULES = [
+    {"id": "rain_delivery", "signal": "weather_rain_prob", "op": ">", "threshold": 0.6,
+     "action": "Promote delivery offers (rainy) — add free delivery banner for 48h."},
+    {"id": "heat_iced", "signal": "weather_temp_c", "op": ">=", "threshold": 28,
+     "action": "Boost iced drinks creative; add discount code ICE10."},
+    {"id": "traffic_instore", "signal": "foot_traffic_idx", "op": ">", "threshold": 0.7,
+     "action": "Shift budget to in-store promos; highlight table reservations."},
+    {"id": "sentiment_care", "signal": "social_sentiment", "op": "<", "threshold": -0.3,
+     "action": "Trigger customer-care playbook; respond to negative reviews."},
+]
+
+OPS = (">", ">=", "<", "<=", "==", "!=")
+_NP_OPS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal, "==": np.equal, "!=": np.not_equal}
+
+def _number(v):
+    # signal value as a float; None when no threshold applies (missing, non-numeric or NaN)
+    try: v = float(v)
+    except (TypeError, ValueError): return None
+    return None if v != v else v
+
+def _numbers(vals):
+    try: return np.asarray(vals, dtype=float)
+    except (TypeError, ValueError): return np.array([_number(v) for v in vals], dtype=float)
+
+class RuleSet:
+    def __init__(self, rules=None):
+        self.rules = [dict(r) for r in (rules if rules is not None else DEFAULT_RULES)]
+        self.index = {}         # signal → op → (sorted thresholds, rule ids in the same order)
+        for i, r in enumerate(self.rules):
+            if r.get("op") not in OPS:
+                raise ValueError(f"Rule {r.get('id', i)!r}: unknown comparator {r.get('op')!r}; expected one of {OPS}")
+            r["threshold"] = float(r["threshold"]); r["cooldown"] = int(r.get("cooldown", 0) or 0)
+            r.setdefault("id", f"rule_{i}")
+            self.index.setdefault(r["signal"], {}).setdefault(r["op"], []).append((r["threshold"], i))
+        for ops in self.index.values():
+            for op, pairs in ops.items():
+                pairs.sort()
+                ops[op] = ([t for t, _ in pairs], [i for _, i in pairs])
+        self.signals = list(self.index)
+        self.actions = [r["action"] for r in self.rules]
+        self.cooldowns = np.array([r["cooldown"] for r in self.rules], dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["rules"] if isinstance(data, dict) else data)
+
+    def match_signal(self, signal, value):
+        """Rule ids whose condition on `signal` holds for `value` (bisection per comparator).
+        Non-numeric values match nothing, as NaN does in `batch`."""
+        value = _number(value)
+        if value is None: return []
+        out = []
+        for op, (thr, ids) in self.index.get(signal, {}).items():
+            if op == ">":    out.extend(ids[:bisect.bisect_left(thr, value)])
+            elif op == ">=": out.extend(ids[:bisect.bisect_right(thr, value)])
+            elif op == "<":  out.extend(ids[bisect.bisect_right(thr, value):])
+            elif op == "<=": out.extend(ids[bisect.bisect_left(thr, value):])
+            elif op == "==": out.extend(ids[bisect.bisect_left(thr, value):bisect.bisect_right(thr, value)])
+            else: out.extend(ids[:bisect.bisect_left(thr, value)] + ids[bisect.bisect_right(thr, value):])
+        return out
+
+    def match(self, signals):
+        fired = []
+        for sig in self.signals:
+            v = signals.get(sig)
+            if v is not None: fired.extend(self.match_signal(sig, v))
+        fired.sort()
+        return fired
+
+    def batch(self, snapshots):
+        """Vectorized conditions over T snapshots → bool array (T, n_rules), cooldowns ignored.
+
+        `snapshots` is either {signal: array of T values} or a list of T signal dicts.
+        """
+        if not isinstance(snapshots, dict):
+            snapshots = {s: np.array([_number(snap.get(s)) for snap in snapshots], dtype=float) for s in self.signals}
+        T = len(next(iter(snapshots.values()))) if snapshots else 0
+        out = np.zeros((T, len(self.rules)), dtype=bool)
+        for sig, ops in self.index.items():
+            vals = snapshots.get(sig)
+            if vals is None: continue
+            vals = _numbers(vals)[:, None]
+            for op, (thr, ids) in ops.items():
+                out[:, ids] = _NP_OPS[op](vals, np.asarray(thr)[None, :]) & ~np.isnan(vals)
+        return out
+
+    def batch_with_cooldown(self, snapshots):
+        """`batch` plus cooldowns: a rule that fired at tick t is suppressed until t + cooldown."""
+        fired = self.batch(snapshots)
+        for i in np.flatnonzero(self.cooldowns > 0):
+            cd = self.cooldowns[i]; nxt = -1
+            col = fired[:, i]
+            for t in np.flatnonzero(col):
+                if t < nxt: col[t] = False
+                else: nxt = t + cd
+        return fired
+
+class RuleEvaluator:
+    """Stateful evaluation for one location: unchanged signals reuse their cached matches."""
+
+    def __init__(self, ruleset=None):
+        self.ruleset = ruleset or RuleSet()
+        self.last_values = {}
+        self.matched = {}           # signal → rule ids currently true
+        self.last_fired = {}        # rule id → tick it last produced an action
+        self.tick = 0
+
+    def step(self, signals):
+        rs = self.ruleset
+        for sig in rs.signals:
+            v = signals.get(sig)
+            if v == self.last_values.get(sig, object()): continue
+            self.last_values[sig] = v
+            self.matched[sig] = rs.match_signal(sig, v) if v is not None else []
+        fired = sorted(i for ids in self.matched.values() for i in ids)
+        actions = []
+        for i in fired:
+            cd = rs.rules[i]["cooldown"]
+            if cd:
+                last = self.last_fired.get(i)
+                if last is not None and self.tick - last < cd: continue
+                self.last_fired[i] = self.tick
+            actions.append(rs.actions[i])
+        self.tick += 1
+        return actions
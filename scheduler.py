@@ -0,0 +1,206 @@
+# scheduler.py
+# Multi-tenant autonomy scheduler: one AutonomyEngine per storefront, each with its own signals,
+# bandit, budget and output directory, ticked from a single asyncio event loop.
+#   python scheduler.py --synthetic 2000 --rate 2 --duration 30 --base-dir /tmp/tenants
+#   python scheduler.py --tenants tenants.json --workers 8 --shard 0/4
+#
+# Dispatch is earliest-deadline-first over a heap of (next due time, seq): every tenant is due
+# once per 1/tick_rate seconds (rate 0 = as often as the loop allows, round-robin). A tenant
+# never has two ticks in flight. When the node is overloaded a late tenant is rescheduled one
+# period from now instead of bursting through its missed ticks, so everyone slows down evenly.
+# `workers=0` ticks inline on the loop thread (cheapest for many small tenants); `workers=N`
+# hands ticks to a thread pool so disk writes overlap. `--shard i/n` runs every n-th tenant, for
+# spreading one tenant file over several processes or nodes.
+
+import os, json, time, heapq, asyncio, argparse
+from concurrent.futures import ThreadPoolExecutor
+from autonomy import AutonomyEngine, CHANNELS, COMPANY, OUTPUT_DIR, _ruleset
+from creatives import CreativeRegistry
+from artifacts import ArtifactStore
+from signals import ReplaySource
+
+class Tenant:
+    def __init__(self, tenant_id, engine, tick_rate=1.0, kpi_refresh=5.0):
+        self.id = tenant_id
+        self.engine = engine
+        self.period = 1.0/tick_rate if tick_rate else 0.0
+        self.kpi_refresh = kpi_refresh
+        self.ticks = 0; self.skipped = 0; self.max_lag = 0.0
+        self.done = False; self.error = None
+        self._kpi_due = 0.0
+
+    def tick(self, now):
+        """One engine step (runs on the loop thread or a worker); KPIs are re-synced every `kpi_refresh` s."""
+        try:
+            e = self.engine
+            if now >= self._kpi_due:
+                self._kpi_due = now + self.kpi_refresh
+                if os.path.exists(os.path.join(e.output_dir, "campaign_kpis.csv")): e.load_kpis()
+            if e.step() is None: self.done = True
+            else: self.ticks += 1
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"; self.done = True
+
+    def sync_state(self):
+        self.engine.state["bandit"] = self.engine.bandit.to_state()
+
+    def stats(self):
+        return {"id": self.id, "ticks": self.ticks, "skipped": self.skipped, "max_lag_s": round(self.max_lag, 4),
+                "done": self.done, "error": self.error}
+
+class TenantScheduler:
+    def __init__(self, tenants=(), workers=0, clock=time.monotonic):
+        self.tenants = {}
+        self.workers = workers
+        self.clock = clock
+        self._heap = []; self._seq = 0
+        self._wake = None
+        tenants = list(tenants); now = clock()
+        for i, t in enumerate(tenants):                 # stagger first ticks across one period
+            self.add(t, now + t.period*i/len(tenants))
+
+    def add(self, tenant, due=None):
+        if tenant.id in self.tenants:
+            raise ValueError(f"Duplicate tenant id {tenant.id!r}")
+        self.tenants[tenant.id] = tenant
+        self._push(tenant, self.clock() if due is None else due)
+
+    def remove(self, tenant_id):
+        """Stop scheduling a tenant; an in-flight tick finishes but is not rescheduled."""
+        t = self.tenants.pop(tenant_id, None)
+        if t is not None: t.done = True
+        return t
+
+    def _push(self, tenant, due):
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, tenant))
+        if self._wake is not None: self._wake.set()
+
+    def _reschedule(self, tenant, due):
+        if tenant.done or self.tenants.get(tenant.id) is not tenant: return
+        now = self.clock()
+        nxt = due + tenant.period
+        if nxt < now - tenant.period:           # more than a period behind: skip, don't burst
+            missed = int((now - nxt)/tenant.period) if tenant.period else 0
+            tenant.skipped += missed; nxt = now
+        self._push(tenant, nxt)
+
+    async def run(self, duration=None, ticks=None):
+        """Tick every tenant until `duration` seconds pass, each has done `ticks` ticks, or all are done."""
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix="tenant") if self.workers else None
+        slots = asyncio.Semaphore(self.workers) if self.workers else None
+        inflight = set()
+        deadline = self.clock() + duration if duration else None
+        t0 = self.clock()
+        try:
+            while self._heap or inflight:
+                if deadline and self.clock() >= deadline: break
+                if not self._heap:
+                    self._wake.clear(); await self._wake.wait(); continue
+                due, _, t = self._heap[0]
+                now = self.clock()
+                if due > now:
+                    self._wake.clear()
+                    wait = due - now if not deadline else min(due - now, deadline - now)
+                    try: await asyncio.wait_for(self._wake.wait(), wait)
+                    except asyncio.TimeoutError: pass
+                    continue
+                heapq.heappop(self._heap)
+                if t.done or self.tenants.get(t.id) is not t: continue
+                if ticks is not None and t.ticks >= ticks:
+                    t.done = True; continue
+                t.max_lag = max(t.max_lag, now - due)
+                if pool is None:
+                    t.tick(now)
+                    self._reschedule(t, due)
+                    if self._seq % 64 == 0: await asyncio.sleep(0)    # let other coroutines run
+                else:
+                    await slots.acquire()
+                    fut = loop.run_in_executor(pool, t.tick, now)
+                    inflight.add(fut)
+                    fut.add_done_callback(lambda f, t=t, due=due: (inflight.discard(f), slots.release(), self._reschedule(t, due)))
+            if inflight: await asyncio.gather(*inflight)
+        finally:
+            if pool is not None: pool.shutdown(wait=True)
+            self._wake = None
+            for t in self.tenants.values(): t.sync_state()
+        return self.summary(self.clock() - t0)
+
+    def summary(self, seconds):
+        total = sum(t.ticks for t in self.tenants.values())
+        lags = sorted(t.max_lag for t in self.tenants.values())
+        return {"tenants": len(self.tenants), "ticks": total, "seconds": round(seconds, 4),
+                "ticks_per_sec": round(total/max(seconds, 1e-9), 1),
+                "skipped": sum(t.skipped for t in self.tenants.values()),
+                "max_lag_s": round(lags[-1], 4) if lags else 0.0,
+                "p99_lag_s": round(lags[int(0.99*(len(lags) - 1))], 4) if lags else 0.0,
+                "errors": {t.id: t.error for t in self.tenants.values() if t.error}}
+
+# ---------- Tenant specs ----------
+def tenant_from_spec(spec, base_dir=OUTPUT_DIR, shared=None):
+    """{"id", "company", "channels", "budget", "tick_rate", "seed", "policy", "variants", "window",
+        "output_dir", "signals", "rules", "creatives"} → Tenant. Omitted rules/creatives share one
+    compiled RuleSet / CreativeRegistry across tenants (`shared` caches them by config path);
+    `shared["artifacts"]`, if set, is the ArtifactStore every tenant writes through."""
+    shared = shared if shared is not None else {}
+    tid = str(spec["id"])
+    out = spec.get("output_dir") or os.path.join(base_dir, tid)
+    os.makedirs(out, exist_ok=True)
+    rules_key = ("rules", json.dumps(spec.get("rules"), sort_keys=True))
+    if rules_key not in shared: shared[rules_key] = _ruleset(spec.get("rules"))
+    cr_key = ("creatives", json.dumps(spec.get("creatives"), sort_keys=True))
+    if cr_key not in shared:
+        c = spec.get("creatives")
+        shared[cr_key] = CreativeRegistry.from_file(c) if isinstance(c, str) else CreativeRegistry(c)
+    source = ReplaySource(spec["signals"], loop=True) if spec.get("signals") else None
+    engine = AutonomyEngine(spec.get("channels") or CHANNELS, spec.get("budget", 5000), spec.get("company", COMPANY), out,
+                            seed=spec.get("seed"), window=spec.get("window"), variants=spec.get("variants") or ("A","B"),
+                            policy=spec.get("policy", "epsilon"), source=source,
+                            rules=shared[rules_key], creatives=shared[cr_key], artifacts=shared.get("artifacts"))
+    return Tenant(tid, engine, spec.get("tick_rate", 1.0), spec.get("kpi_refresh", 5.0))
+
+def load_specs(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data["tenants"] if isinstance(data, dict) else data
+
+def synthetic_specs(n, tick_rate=1.0, seed=0):
+    return [{"id": f"store-{i:05d}", "company": f"Store {i}", "tick_rate": tick_rate, "seed": seed + i} for i in range(n)]
+
+def shard(specs, spec):
+    i, n = (int(x) for x in spec.split("/"))
+    return specs[i::n]
+
+# ---------- CLI ----------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Run many businesses' autonomy loops on one node.")
+    p.add_argument("--tenants", default=None, help="JSON list of tenant specs (or {\"tenants\": [...]})")
+    p.add_argument("--synthetic", type=int, default=0, help="generate N default tenants instead")
+    p.add_argument("--rate", type=float, default=1.0, help="ticks/s for synthetic tenants and specs without tick_rate (0 = max)")
+    p.add_argument("--base-dir", default=OUTPUT_DIR, help="per-tenant output dirs are <base-dir>/<id>")
+    p.add_argument("--duration", type=float, default=None, help="seconds to run")
+    p.add_argument("--ticks", type=int, default=None, help="stop each tenant after this many ticks")
+    p.add_argument("--workers", type=int, default=0, help="thread pool size (0 = tick inline on the event loop)")
+    p.add_argument("--shard", default="0/1", help="i/n: run every n-th tenant starting at i")
+    p.add_argument("--write-behind", type=float, default=0, help="coalesce artifact writes over this many seconds (0 = write inline)")
+    p.add_argument("--per-tenant", action="store_true", help="print per-tenant stats as JSON lines")
+    args = p.parse_args(argv)
+    if args.duration is None and args.ticks is None:
+        p.error("give --duration and/or --ticks")
+
+    specs = load_specs(args.tenants) if args.tenants else synthetic_specs(args.synthetic, args.rate)
+    for s in specs: s.setdefault("tick_rate", args.rate)
+    shared = {"artifacts": ArtifactStore(window=args.write_behind)} if args.write_behind else {}
+    sched = TenantScheduler([tenant_from_spec(s, args.base_dir, shared) for s in shard(specs, args.shard)], workers=args.workers)
+    summary = asyncio.run(sched.run(args.duration, args.ticks))
+    if args.write_behind:
+        shared["artifacts"].close()
+        summary["artifact_writes"] = shared["artifacts"].writes; summary["artifact_coalesced"] = shared["artifacts"].coalesced
+    if args.per_tenant:
+        for t in sched.tenants.values(): print(json.dumps(t.stats()))
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
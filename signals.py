@@ -0,0 +1,181 @@
+# signals.py
+# Real-time signal sources for the Sense step.
+#   RandomWalkSource — the demo's random-walk weather / foot-traffic / sentiment (default)
+#   ReplaySource     — recorded CSV / JSONL traces, timestamp-accurate or max-speed playback
+#   HTTPSource       — polls a JSON endpoint; StubSignalServer serves one locally for testing
+# Every source updates `state["signals"]` in place and returns it; `read` returns None when exhausted.
+
+import os, csv, json, time, random, threading, urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SIGNALS = {
+    "weather_temp_c": 22.0,
+    "weather_rain_prob": 0.2,
+    "foot_traffic_idx": 0.5,
+    "social_sentiment": 0.1,
+}
+
+def _rand_trend(prev, lo, hi, step=0.1, rng=random):
+    val = prev + rng.uniform(-step, step)
+    return max(lo, min(hi, val))
+
+def sense_real_time(state, rng=random):
+    now = datetime.now().isoformat()
+    s = state.setdefault("signals", dict(DEFAULT_SIGNALS))
+    s["weather_temp_c"] = _rand_trend(s["weather_temp_c"], 0, 40, 1.5, rng)
+    s["weather_rain_prob"] = _rand_trend(s["weather_rain_prob"], 0, 1, 0.15, rng)
+    s["foot_traffic_idx"] = _rand_trend(s["foot_traffic_idx"], 0, 1, 0.12, rng)
+    s["social_sentiment"] = _rand_trend(s["social_sentiment"], -1, 1, 0.1, rng)
+    s["timestamp"] = now
+    return s
+
+def _merge(state, record):
+    s = state.setdefault("signals", dict(DEFAULT_SIGNALS))
+    s.update(record)
+    if "timestamp" not in record: s["timestamp"] = datetime.now().isoformat()
+    return s
+
+# ---------- Sources ----------
+class SignalSource:
+    def read(self, state):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class RandomWalkSource(SignalSource):
+    def __init__(self, rng=random):
+        self.rng = rng
+
+    def read(self, state):
+        return sense_real_time(state, self.rng)
+
+def _parse_ts(v):
+    if v in (None, ""): return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(v)).timestamp()
+
+def _coerce(record):
+    out = {}
+    for k, v in record.items():
+        if v in (None, ""): continue
+        if k == "timestamp":
+            out[k] = v; continue
+        try:
+            out[k] = float(v)
+        except (TypeError, ValueError):
+            out[k] = v
+    return out
+
+class ReplaySource(SignalSource):
+    """Streams a recorded trace (.csv with a header, or .jsonl) one record per tick.
+
+    `speed=None` replays as fast as the loop can consume; `speed=1.0` honours the recorded
+    `timestamp` gaps in wall-clock time, `speed=60` plays an hour per minute. `loop=True`
+    restarts at the end of the file instead of returning None.
+    """
+
+    def __init__(self, path, speed=None, loop=False, clock=time.monotonic, sleep=time.sleep):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock; self.sleep = sleep
+        self.records = 0
+        self._it = None; self._f = None
+        self._t0 = None; self._wall0 = None
+
+    def _open(self):
+        self.close()
+        self._f = open(self.path, newline="")
+        if os.path.splitext(self.path)[1].lower() in (".jsonl", ".ndjson", ".json"):
+            self._it = (json.loads(line) for line in self._f if line.strip())
+        else:
+            self._it = csv.DictReader(self._f)
+        self._t0 = None
+
+    def _next_record(self):
+        if self._it is None: self._open()
+        rec = next(self._it, None)
+        if rec is None and self.loop and self.records:
+            self._open(); rec = next(self._it, None)
+        return rec
+
+    def read(self, state):
+        rec = self._next_record()
+        if rec is None:
+            self.close()
+            return None
+        rec = _coerce(rec)
+        if self.speed:
+            ts = _parse_ts(rec.get("timestamp"))
+            if ts is not None:
+                if self._t0 is None:
+                    self._t0, self._wall0 = ts, self.clock()
+                delay = (ts - self._t0)/self.speed - (self.clock() - self._wall0)
+                if delay > 0: self.sleep(delay)
+        self.records += 1
+        return _merge(state, rec)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+        self._f = None; self._it = None
+
+class HTTPSource(SignalSource):
+    """Polls `url` for a JSON object of signals each tick."""
+
+    def __init__(self, url, timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def read(self, state):
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as resp:
+            if resp.status == 204: return None
+            rec = json.loads(resp.read().decode("utf-8"))
+        return _merge(state, _coerce(rec))
+
+# ---------- Local stub server ----------
+class StubSignalServer:
+    """Serves signals from another source (random walk by default) as JSON over local HTTP.
+
+    GET / returns the next snapshot; 204 once the wrapped source is exhausted.
+    """
+
+    def __init__(self, source=None, host="127.0.0.1", port=0):
+        self.source = source or RandomWalkSource()
+        self.state = {}
+        lock = threading.Lock()
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with lock:
+                    sig = outer.source.read(outer.state)
+                    body = json.dumps(sig).encode() if sig is not None else b""
+                self.send_response(200 if sig is not None else 204)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown(); self.server.server_close()